@@ -0,0 +1,89 @@
+from array import array
+from mark import split_name, first_names_match
+
+# 全部论文作者的驻留表：spider.py 和 mark.py 共用
+#
+# 同一位作者在整个导出文件中反复出现，每个规范化名只保存一次并分配一个整数ID，
+# 每行的作者列表保存为紧凑的整数数组；判断两个名字是否为同一作者时按ID比较，
+# 姓相同、名需要模糊比较的ID对只计算一次并缓存结果
+#
+# 规范化规则与 mark.normalize_name 相同，规范化名相同的两个写法得到同一个ID；
+# 没有逗号的名字在 exact_plain_names=True 时按原始写法区分，与 mark.is_same_author 只认完全相同的字符串一致
+
+class AuthorRegistry:
+    """作者名到整数ID的驻留表，以及ID之间的同一作者判断缓存
+
+    ids: {(姓, 名): ID}
+    last_names / first_names: 按ID保存的姓和去掉连字符、空白后的名；没有逗号的名字姓为None，只与同一ID相同
+    exact_plain_names: 为True时没有逗号的名字以原始写法作为名，写法不同即为不同作者（mark.py 的规则）；
+        为False时按规范化名区分（spider.py 的规则）
+    """
+
+    def __init__(self, exact_plain_names=False):
+        self.exact_plain_names = exact_plain_names
+        self.ids = {}
+        self.last_names = []
+        self.first_names = []
+        self._raw_ids = {}   # {原始写法: ID}，同一写法只规范化一次
+        self._same = {}      # {(较小ID, 较大ID): 是否同一作者}
+
+    def __len__(self):
+        return len(self.last_names)
+
+    def intern(self, name):
+        """返回名字的ID，第一次出现的规范化名分配新ID（不加锁，只在一个线程中调用）"""
+        author_id = self._raw_ids.get(name)
+        if author_id is not None:
+            return author_id
+        key = self._key(name)
+        author_id = self.ids.get(key)
+        if author_id is None:
+            author_id = self.ids[key] = len(self.last_names)
+            self.last_names.append(key[0])
+            self.first_names.append(key[1])
+        self._raw_ids[name] = author_id
+        return author_id
+
+    def lookup(self, name):
+        """已登记的名字的ID，没有登记过的返回None；不分配新ID，可以在多个线程中同时调用"""
+        author_id = self._raw_ids.get(name)
+        if author_id is None:
+            author_id = self.ids.get(self._key(name))
+        return author_id
+
+    def _key(self, name):
+        last_name, first_name = split_name(name)
+        if last_name is None and self.exact_plain_names:
+            first_name = name
+        return last_name, first_name
+
+    def row_ids(self, authors):
+        """把以分号分隔的作者列表转换为ID数组，忽略空名字"""
+        return array('i', [self.intern(name) for name in (part.strip() for part in str(authors).split(';')) if name])
+
+    def same_author(self, id1, id2):
+        """两个ID是否为同一作者，有逗号的名字规则与 mark.is_same_author 相同：姓相同且名一致或只差缩写"""
+        if id1 == id2:
+            return True
+        last_name = self.last_names[id1]
+        if last_name is None or last_name != self.last_names[id2]:
+            return False
+        pair = (id1, id2) if id1 < id2 else (id2, id1)
+        same = self._same.get(pair)
+        if same is None:
+            same = self._same[pair] = first_names_match(self.first_names[id1], self.first_names[id2])
+        return same
+
+    def candidates(self, ids):
+        """把一组ID按姓分组，供 matches 使用：姓不同的名字不需要逐个比较"""
+        groups = {}
+        for author_id in ids:
+            groups.setdefault(self.last_names[author_id], []).append(author_id)
+        return groups
+
+    def matches(self, author_id, candidates):
+        """author_id 是否与 candidates（见 candidates()）中的某一个为同一作者"""
+        same_last = candidates.get(self.last_names[author_id])
+        if not same_last:
+            return False
+        return any(self.same_author(author_id, candidate) for candidate in same_last)
@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+import pandas as pd
+from table_io import TableWriter, read_columns
+from mock_wos_api import start_mock_server, mock_api_key
+from mock_wos_site import start_mock_site
+
+# 离线基准测试：不访问真实的WOS，在合成表格上测量 spider.py 的吞吐量和 mark.py 的标记耗时
+#
+#   spider  启动本地模拟网站（mock_wos_site.py，浏览器后端）或模拟API（mock_wos_api.py），
+#           在子进程中运行 spider.py，记录每小时处理行数和各阶段耗时（来自运行指标汇总）
+#   mark    在合成作者列表上测量 mark_corresponding_authors、is_same_author 和整个文件的标记耗时
+#
+# 结果写入JSON文件，可用 --compare 与之前的结果对比，找出吞吐量或标记耗时的退化
+
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+surnames = ['Wang', 'Li', 'Zhang', 'Liu', 'Chen', 'Yang', 'Zhao', 'Huang', 'Zhou', 'Wu', 'Xu', 'Sun', 'Zheng',
+            'Smith', 'Johnson', 'Brown', 'Garcia', 'Miller', 'Davis', 'Muller', 'Schmidt', 'Kim', 'Park', 'Tanaka',
+            'Suzuki', 'Rossi', 'Silva', 'Santos', 'Nguyen', 'Singh', 'Kumar', 'Ivanov', 'Fan', 'Guo', 'Ma', 'He']
+given_names = ['Wei', 'Weiwei', 'Yu-Feng', 'Xiao-Ming', 'Jing', 'Hao', 'Lei', 'Yan', 'Jun', 'Yubo', 'Min-Jun',
+               'Hui', 'Li-Na', 'Qiang', 'Tao', 'John', 'Mary', 'Anna', 'Peter', 'Maria', 'Hiroshi', 'Jose',
+               'Ji-Hoon', 'Rahul', 'Olga', 'Sofia', 'Luca', 'Chen-Xi', 'Zhi-Qiang', 'Ming']
+title_words = ['analysis', 'adaptive', 'bone', 'cell', 'clinical', 'composite', 'control', 'deep', 'design',
+               'dynamic', 'effect', 'efficient', 'electrode', 'energy', 'evaluation', 'framework', 'graphene',
+               'growth', 'imaging', 'implant', 'learning', 'mechanical', 'model', 'network', 'novel', 'optical',
+               'performance', 'polymer', 'prediction', 'protein', 'response', 'robust', 'scaffold', 'sensor',
+               'simulation', 'stability', 'structure', 'study', 'surface', 'synthesis', 'system', 'thermal',
+               'tissue', 'transport', 'tumor', 'validation', 'water', 'with', 'under', 'based', 'using', 'via']
+
+# ---- 合成数据 ----
+
+def name_variant(name, rng):
+    """通讯作者的常见写法差异：去掉名中的连字符，或与作者列表完全相同"""
+    last, first = name.split(', ')
+    if '-' in first and rng.random() < 0.5:
+        return f"{last}, {first.replace('-', '')}"
+    return name
+
+def synthetic_papers(count, seed=0):
+    """生成合成文章，返回 [{'title', 'authors', 'corresponding', 'doi'}]
+
+    每篇 3~12 位作者，1~2 位通讯作者，部分通讯作者的写法与作者列表略有不同，
+    少数通讯作者不在作者列表中
+    """
+    rng = random.Random(seed)
+    papers = []
+    for i in range(count):
+        words = rng.sample(title_words, rng.randint(5, 10))
+        # 末尾的编号保证标题互不相同
+        title = ' '.join(words).capitalize() + f' S{i}'
+        authors = []
+        for _ in range(rng.randint(3, 12)):
+            name = f"{rng.choice(surnames)}, {rng.choice(given_names)}"
+            if name not in authors:
+                authors.append(name)
+        corresponding = [name_variant(name, rng) for name in rng.sample(authors, min(len(authors), rng.randint(1, 2)))]
+        if rng.random() < 0.05:
+            corresponding.append(f"{rng.choice(surnames)}, {rng.choice(given_names)}")
+        papers.append({'title': title, 'authors': authors, 'corresponding': corresponding,
+                       'doi': f'10.5555/bench.{seed}.{i}'})
+    return papers
+
+def write_spider_input(path, papers):
+    with TableWriter(path, ['全部论文作者', '论文题目', 'DOI']) as writer:
+        for paper in papers:
+            writer.write_row(['; '.join(paper['authors']), paper['title'], paper['doi']])
+
+def mark_frame(papers):
+    """mark.py 的输入：spider.py 输出中的各列"""
+    return pd.DataFrame({
+        '全部论文作者': ['; '.join(paper['authors']) for paper in papers],
+        '通讯作者': ['; '.join(paper['corresponding']) for paper in papers],
+        '论文题目': [paper['title'] for paper in papers],
+        '处理状态': 'success',
+    })
+
+def mock_records(papers, miss_rate, seed=0):
+    """模拟服务中的记录，按 miss_rate 随机去掉一部分文章，这些文章检索不到结果"""
+    rng = random.Random(seed + 1)
+    return [{'title': paper['title'], 'corresponding': paper['corresponding']}
+            for paper in papers if rng.random() >= miss_rate]
+
+def timed_runs(func, repeat):
+    """运行repeat次，返回每次的秒数"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+# ---- mark.py 基准 ----
+
+def bench_mark(sizes, repeat, work_dir):
+    import mark
+    results = []
+    for size in sizes:
+        papers = synthetic_papers(size)
+        frame = mark_frame(papers)
+        durations = timed_runs(lambda: mark.mark_corresponding_authors(frame), repeat)
+        marked = mark.mark_corresponding_authors(frame)
+        star_count = int(marked.str.count(r'\*').sum())
+
+        # 整个文件：读入、分块标记、写出
+        input_file = os.path.join(work_dir, f'mark_input_{size}.csv')
+        output_file = os.path.join(work_dir, f'mark_output_{size}.csv')
+        with TableWriter(input_file, list(frame.columns)) as writer:
+            for values in frame.itertuples(index=False):
+                writer.write_row(values)
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            file_durations = timed_runs(lambda: mark.mark_file(input_file, output_file), repeat)
+
+        results.append({
+            'rows': size,
+            'mark_seconds': min(durations),
+            'mark_seconds_median': statistics.median(durations),
+            'rows_per_second': size / min(durations),
+            'file_seconds': min(file_durations),
+            'marked_authors': star_count,
+        })
+        print(f"mark    {size:>7} 行: 标记 {min(durations):.3f}s, 整个文件 {min(file_durations):.3f}s, "
+              f"标记了 {star_count} 位通讯作者")
+
+    # 单次姓名比较，作者列表中的所有两两组合
+    papers = synthetic_papers(200)
+    pairs = [(a, b) for paper in papers for a in paper['authors'] for b in paper['corresponding']]
+    durations = timed_runs(lambda: [mark.is_same_author(a, b) for a, b in pairs], repeat)
+    normalize_durations = timed_runs(lambda: [mark.normalize_name(a) for a, _ in pairs], repeat)
+    micro = {
+        'pairs': len(pairs),
+        'is_same_author_us': min(durations) / len(pairs) * 1e6,
+        'normalize_name_us': min(normalize_durations) / len(pairs) * 1e6,
+    }
+    print(f"mark    is_same_author {micro['is_same_author_us']:.2f}us/次, "
+          f"normalize_name {micro['normalize_name_us']:.2f}us/次")
+    return {'sizes': results, 'micro': micro}
+
+# ---- spider.py 基准 ----
+
+def start_mock(backend, records, latency, jitter):
+    """启动模拟服务，返回 (server, 请求计数函数, spider.py的额外参数)"""
+    if backend == 'api':
+        server, url = start_mock_server(records, latency=latency)
+        return server, lambda: server.api.request_count, ['--backend', 'api', '--api-url', url,
+                                                           '--api-key', mock_api_key]
+    server, url = start_mock_site(records, latency=latency, jitter=jitter)
+    return server, lambda: server.site.request_count, ['--base-url', url, '--headless']
+
+def expected_authors(paper):
+    """按spider.py的规则，通讯作者中出现在作者列表（规范化后）中的名字带星号"""
+    from mark import normalize_name
+    row_authors = {normalize_name(author) for author in paper['authors']}
+    return '; '.join(name + '*' if normalize_name(name) in row_authors else name
+                     for name in paper['corresponding'])
+
+def bench_spider(sizes, args, work_dir):
+    results = []
+    for size in sizes:
+        papers = synthetic_papers(size)
+        run_dir = os.path.join(work_dir, f'spider_{args.backend}_{size}')
+        os.makedirs(run_dir, exist_ok=True)
+        write_spider_input(os.path.join(run_dir, 'paper.csv'), papers)
+
+        server, request_count, backend_args = start_mock(args.backend, mock_records(papers, args.miss_rate),
+                                                         args.latency, args.jitter)
+        command = [sys.executable, os.path.join(repo_dir, 'spider.py'), '--mode', 'complete',
+                   '--workers', str(args.workers), '--batch-size', str(args.batch_size),
+                   '--rate-limit', '0', '--no-cache', '--retry-delay', '0',
+                   '--output', 'result.csv', '--metrics-file', 'metrics.jsonl'] + backend_args
+        start = time.perf_counter()
+        try:
+            with open(os.path.join(run_dir, 'console.txt'), 'w', encoding='utf-8') as console:
+                returncode = subprocess.call(command, cwd=run_dir, stdout=console, stderr=subprocess.STDOUT,
+                                             timeout=args.timeout)
+        finally:
+            wall_seconds = time.perf_counter() - start
+            server.shutdown()
+
+        result_file = os.path.join(run_dir, 'result.csv')
+        summary_file = os.path.join(run_dir, 'metrics_summary.json')
+        if returncode != 0 or not os.path.exists(result_file):
+            print(f"spider  {size:>7} 行: 运行失败，见 {os.path.join(run_dir, 'console.txt')}")
+            results.append({'rows': size, 'error': f'exit code {returncode}'})
+            continue
+
+        output = read_columns(result_file, ['通讯作者', '处理状态'])
+        statuses = output['处理状态'].value_counts().to_dict()
+        correct = sum(1 for paper, authors in zip(papers, output['通讯作者'])
+                      if not pd.isna(authors) and authors == expected_authors(paper))
+        stages = {}
+        if os.path.exists(summary_file):
+            with open(summary_file, encoding='utf-8') as f:
+                stages = json.load(f)['stages']
+
+        results.append({
+            'rows': size,
+            'wall_seconds': wall_seconds,
+            'rows_per_hour': size / wall_seconds * 3600,
+            'requests': request_count(),
+            'statuses': statuses,
+            'correct': correct,
+            'stages': {stage: {key: values[key] for key in ('count', 'p50', 'p95', 'p99')}
+                       for stage, values in stages.items()},
+        })
+        print(f"spider  {size:>7} 行: {wall_seconds:.1f}s, {size / wall_seconds * 3600:.0f} 行/小时, "
+              f"请求 {request_count()} 次, 结果正确 {correct}/{size}, 状态 {statuses}")
+    return results
+
+# ---- 结果对比 ----
+
+def comparable_metrics(results):
+    """{(测试项, 行数): (指标值, 越大越好)}"""
+    metrics = {}
+    for entry in results.get('mark', {}).get('sizes', []):
+        metrics[('mark', entry['rows'])] = (entry['mark_seconds'], False)
+        metrics[('mark_file', entry['rows'])] = (entry['file_seconds'], False)
+    micro = results.get('mark', {}).get('micro')
+    if micro:
+        metrics[('is_same_author_us', None)] = (micro['is_same_author_us'], False)
+    for entry in results.get('spider', []):
+        if 'rows_per_hour' in entry:
+            metrics[(f"spider_{results['settings']['backend']}", entry['rows'])] = (entry['rows_per_hour'], True)
+    return metrics
+
+def compare_results(baseline, current, tolerance):
+    """打印与基准结果的差异，返回退化超过tolerance（比例）的测试项"""
+    old_metrics = comparable_metrics(baseline)
+    regressions = []
+    for key, (value, higher_is_better) in comparable_metrics(current).items():
+        if key not in old_metrics or not old_metrics[key][0]:
+            continue
+        old_value = old_metrics[key][0]
+        change = (value - old_value) / old_value
+        worse = -change if higher_is_better else change
+        name = key[0] if key[1] is None else f'{key[0]} {key[1]}行'
+        flag = '  <-- 退化' if worse > tolerance else ''
+        print(f"{name:<28}{old_value:>14.3f} → {value:>14.3f} ({change:+.1%}){flag}")
+        if worse > tolerance:
+            regressions.append(name)
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='离线基准测试：本地模拟WOS上的 spider.py 吞吐量和 mark.py 标记耗时')
+    parser.add_argument('--suite', type=str, choices=['all', 'spider', 'mark'], default='all',
+                        help='运行哪些测试 (默认: all)')
+    parser.add_argument('--sizes', type=str, default='100,1000,10000',
+                        help='合成表格的行数，逗号分隔 (默认: 100,1000,10000)')
+    parser.add_argument('--backend', type=str, choices=['selenium', 'api'], default='selenium',
+                        help='spider.py 的抓取后端: selenium-无头浏览器访问模拟网站（需要Chrome）, api-模拟API (默认: selenium)')
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help='模拟服务每个页面（或API请求）响应前等待的秒数 (默认: 0.2)')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='模拟网站在 --latency 之上随机增加的最大秒数 (默认: 0.1)')
+    parser.add_argument('--miss-rate', type=float, default=0.02,
+                        help='模拟服务中检索不到的文章比例 (默认: 0.02)')
+    parser.add_argument('--workers', type=int, default=1, help='spider.py 的 --workers (默认: 1)')
+    parser.add_argument('--batch-size', type=int, default=1, help='spider.py 的 --batch-size (默认: 1)')
+    parser.add_argument('--timeout', type=float, default=None, help='每次运行 spider.py 的最长秒数 (默认: 不限制)')
+    parser.add_argument('--repeat', type=int, default=3, help='mark.py 每项测试重复次数，取最快一次 (默认: 3)')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                        help='结果JSON文件 (默认: benchmark_results.json)')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='与之前的结果JSON对比，退化超过 --tolerance 时以非零状态退出')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='允许的退化比例 (默认: 0.1，即10%%)')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='保存合成表格和运行输出的目录，默认使用临时目录并在结束后删除')
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        parser.error('--sizes 应为逗号分隔的整数，例如 100,1000,10000')
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='authorminer_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {key: getattr(args, key) for key in ('sizes', 'backend', 'latency', 'jitter', 'miss_rate',
+                                                         'workers', 'batch_size', 'repeat')},
+    }
+    try:
+        if args.suite in ('all', 'mark'):
+            results['mark'] = bench_mark(sizes, args.repeat, work_dir)
+        if args.suite in ('all', 'spider'):
+            results['spider'] = bench_spider(sizes, args, work_dir)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare_results(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"退化超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
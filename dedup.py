@@ -0,0 +1,84 @@
+import re
+from title_normalizer import is_missing
+
+# 合并导出（不同子库、重叠的检索式）中同一篇文章常出现多次，检索前先把重复的行分组，
+# 每组只检索一次，结果再分发给组内所有行
+
+doi_prefix_pattern = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+def normalize_doi(doi):
+    """DOI不区分大小写，去掉 https://doi.org/ 或 doi: 前缀"""
+    if is_missing(doi):
+        return ''
+    return doi_prefix_pattern.sub('', str(doi).strip()).lower()
+
+def normalize_ut(ut):
+    """WOS入藏号(UT)，去掉 WOS: 前缀"""
+    if is_missing(ut):
+        return ''
+    ut = str(ut).strip().upper()
+    return ut[4:] if ut.startswith('WOS:') else ut
+
+def row_key(title_key, doi=None, ut=None):
+    """一行文章的标识：有DOI时为 doi:DOI，其次为 ut:UT，两者都没有时为标题键
+
+    与 group_duplicates 一样，同名但DOI（或UT）不同的文章得到不同的键
+    """
+    doi = normalize_doi(doi)
+    if doi:
+        return 'doi:' + doi
+    ut = normalize_ut(ut)
+    if ut:
+        return 'ut:' + ut
+    return title_key
+
+def group_duplicates(title_keys, dois=None, uts=None):
+    """为每一行返回所属文章组的编号，同一组的行是同一篇文章
+
+    有DOI或UT的行按DOI/UT分组（两者任一相同即为同一篇），不同DOI的同名文章不会合并
+    （例如 Editorial、Reply 这类通用标题）；没有DOI和UT的行按标题键分组，
+    如果同一标题只对应一个有DOI/UT的组，就并入该组。标题键为空的行各自单独成组。
+    """
+    count = len(title_keys)
+    dois = [normalize_doi(doi) for doi in dois] if dois is not None else [''] * count
+    uts = [normalize_ut(ut) for ut in uts] if uts is not None else [''] * count
+
+    # 并查集：DOI或UT相同的行合并为一组
+    parent = list(range(count))
+
+    def find(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    first_with = {}
+    for idx in range(count):
+        for key in (f'doi:{dois[idx]}' if dois[idx] else None, f'ut:{uts[idx]}' if uts[idx] else None):
+            if key is None:
+                continue
+            if key in first_with:
+                parent[find(idx)] = find(first_with[key])
+            else:
+                first_with[key] = idx
+
+    # 标题键 → 带标识符的组
+    identified_groups = {}
+    for idx in range(count):
+        if (dois[idx] or uts[idx]) and title_keys[idx]:
+            identified_groups.setdefault(title_keys[idx], set()).add(find(idx))
+
+    title_only = {}
+    for idx in range(count):
+        key = title_keys[idx]
+        if dois[idx] or uts[idx] or not key:
+            continue
+        groups = identified_groups.get(key, set())
+        if len(groups) == 1:
+            parent[idx] = next(iter(groups))
+        elif key in title_only:
+            parent[idx] = title_only[key]
+        else:
+            title_only[key] = idx
+
+    return [find(idx) for idx in range(count)]
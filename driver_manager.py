@@ -0,0 +1,140 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 统计浏览器进程树的内存需要可选依赖psutil，未安装时只按页数回收
+def _import_psutil():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"关闭浏览器时出错: {e}")
+
+# 浏览器生命周期管理：复用、健康检查，按页数或内存回收并提前准备备用浏览器
+class DriverManager:
+    """管理一个工作线程使用的浏览器
+
+    参数:
+    factory: 无参函数，启动浏览器并打开检索页，返回 (driver, wait)
+    name: 日志中使用的名字
+    max_pages: 处理多少个页面后回收浏览器，0表示不按页数回收
+    max_rss_mb: 浏览器进程树内存超过该值(MB)时回收，需要安装psutil，None表示不检查
+    warm_spare: 是否在接近回收条件时提前在后台启动备用浏览器，回收时直接切换
+    health_timeout: 健康检查等待浏览器响应的秒数，超时视为会话卡死
+    """
+
+    def __init__(self, factory, name='浏览器', max_pages=300, max_rss_mb=None, warm_spare=True,
+                 health_timeout=15):
+        self.factory = factory
+        self.name = name
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.warm_spare = warm_spare
+        self.health_timeout = health_timeout
+        self.psutil = _import_psutil() if max_rss_mb else None
+        if max_rss_mb and self.psutil is None:
+            logger.warning("未安装psutil，无法按内存回收浏览器，只按页数回收")
+
+        self.current = None
+        self.pages = 0
+        self.spare = None  # 后台启动中的备用浏览器 (Future)
+        # 备用浏览器在后台线程中启动，不阻塞爬取
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spare-browser')
+
+    def acquire(self):
+        """返回可用的 (driver, wait)，必要时启动或重启浏览器"""
+        if self.current is None:
+            self._switch('启动')
+        elif not self._is_healthy():
+            logger.warning(f"{self.name}无响应或已崩溃，正在重启")
+            self._switch('重启')
+        return self.current
+
+    def page_done(self, pages=1):
+        """记录处理过的页面数，达到回收条件时切换到新的浏览器"""
+        self.pages += pages
+        rss_mb = self._rss_mb()
+
+        near_limit = (self.max_pages and self.pages >= self.max_pages * 0.8) or \
+                     (rss_mb is not None and rss_mb >= self.max_rss_mb * 0.8)
+        if self.warm_spare and near_limit and self.spare is None:
+            logger.info(f"{self.name}接近回收条件，后台启动备用浏览器")
+            self.spare = self.executor.submit(self.factory)
+
+        if self.max_pages and self.pages >= self.max_pages:
+            self._switch(f'已处理{self.pages}个页面，回收')
+        elif rss_mb is not None and rss_mb >= self.max_rss_mb:
+            self._switch(f'内存占用{rss_mb:.0f}MB，回收')
+
+    def mark_unhealthy(self):
+        """调用方发现浏览器异常时，立即切换到新的浏览器"""
+        if self.current is not None:
+            self._switch('重启')
+
+    def close(self):
+        if self.current is not None:
+            _quit_quietly(self.current[0])
+            self.current = None
+        if self.spare is not None:
+            try:
+                _quit_quietly(self.spare.result()[0])
+            except Exception:
+                pass
+            self.spare = None
+        self.executor.shutdown(wait=False)
+
+    def _switch(self, reason):
+        old = self.current
+        self.current = None
+        if old is not None:
+            # 卡死的浏览器quit也可能卡住，放到后台线程关闭
+            threading.Thread(target=_quit_quietly, args=(old[0],), daemon=True).start()
+
+        new = None
+        if self.spare is not None:
+            try:
+                new = self.spare.result()
+            except Exception as e:
+                logger.warning(f"备用浏览器启动失败: {e}")
+            self.spare = None
+        if new is None:
+            new = self.factory()
+
+        self.current = new
+        self.pages = 0
+        logger.info(f"{self.name}{reason}，已切换到新的浏览器")
+
+    def _is_healthy(self):
+        driver = self.current[0]
+        result = {}
+
+        def ping():
+            try:
+                result['state'] = driver.execute_script('return document.readyState')
+            except Exception as e:
+                result['error'] = e
+
+        # 卡死的会话不会返回，用单独的守护线程检查，超时即放弃
+        thread = threading.Thread(target=ping, daemon=True)
+        thread.start()
+        thread.join(self.health_timeout)
+        return 'state' in result
+
+    def _rss_mb(self):
+        """浏览器进程树（chromedriver及其子进程）的常驻内存，无法统计时返回None"""
+        if self.psutil is None or self.current is None:
+            return None
+        try:
+            process = self.psutil.Process(self.current[0].service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
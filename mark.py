@@ -1,12 +1,16 @@
-import pandas as pd
+import os
 import re
+import argparse
+from table_io import iter_chunks, read_header, TableWriter
 
-# Load the data
-file_path = 'paper_with_authors_final.xlsx'
-df = pd.read_excel(file_path)
+# pandas and author_registry (which imports this module for the name rules)
+# are imported inside the marking functions, so importing the name matchers
+# (normalize_name, is_same_author) stays cheap
 
-# Function to normalize author names for better matching
-def normalize_name(name):
+# Split a name into its lowercased last name and its first name with
+# punctuation and spaces removed; names without a comma have no last name
+# and come back as (None, normalized name)
+def split_name(name):
     # Remove any asterisk symbols first
     name = name.replace('*', '')
     # Split name by comma and clean spaces
@@ -18,10 +22,32 @@ def normalize_name(name):
         # Join all other parts and remove punctuation
         first_name = ' '.join(parts[1:]).lower()
         first_name = re.sub(r'[-_\s;]+', '', first_name).strip()
-        return f"{last_name}_{first_name}"
+        return last_name, first_name
     else:
         # For names without commas, just normalize
-        return re.sub(r'[-_\s;]+', '', name.lower()).strip()
+        return None, re.sub(r'[-_\s;]+', '', name.lower()).strip()
+
+# Function to normalize author names for better matching
+def normalize_name(name):
+    last_name, first_name = split_name(name)
+    return first_name if last_name is None else f"{last_name}_{first_name}"
+
+# Function to check if two normalized first names refer to the same person
+def first_names_match(first_name1, first_name2):
+    # If first names are identical after normalization
+    if first_name1 == first_name2:
+        return True
+    
+    # Check if one name contains the other (for handling abbreviated vs full names)
+    # This is intentionally limited to avoid false positives like Wei vs Weiwei
+    # Only match if lengths are very similar or one is a clear subset
+    len_diff = abs(len(first_name1) - len(first_name2))
+    
+    # Only consider as potential match if length difference is small
+    if len_diff <= 2:
+        return first_name1 in first_name2 or first_name2 in first_name1
+        
+    return False
 
 # Function to check if two author names match based on last name and similar first name
 def is_same_author(author1, author2):
@@ -49,61 +75,79 @@ def is_same_author(author1, author2):
     first_name1 = ''.join(re.sub(r'[-_\s;]+', '', ' '.join(parts1[1:]).lower()))
     first_name2 = ''.join(re.sub(r'[-_\s;]+', '', ' '.join(parts2[1:]).lower()))
     
-    # If first names are identical after normalization
-    if first_name1 == first_name2:
-        return True
-    
-    # Check if one name contains the other (for handling abbreviated vs full names)
-    # This is intentionally limited to avoid false positives like Wei vs Weiwei
-    # Only match if lengths are very similar or one is a clear subset
-    len_diff = abs(len(first_name1) - len(first_name2))
-    
-    # Only consider as potential match if length difference is small
-    if len_diff <= 2:
-        return first_name1 in first_name2 or first_name2 in first_name1
-        
-    return False
-
-# Function to mark corresponding authors with an asterisk
-def mark_corresponding_authors(row):
-    if pd.isna(row['通讯作者']):
-        return row['全部论文作者']  # Return authors column unchanged if no corresponding authors
-    
-    corresponding_authors = [author.strip() for author in str(row['通讯作者']).split(';')]
-    all_authors = [author.strip() for author in str(row['全部论文作者']).split(';')]
-    
-    # Add asterisk to corresponding authors
-    marked_authors = []
-    for author in all_authors:
-        # 检查作者名字是否已经有星号标记
-        if author.endswith('*'):
-            # 如果已经有星号，直接添加不做改变
-            marked_authors.append(author)
-        elif any(is_same_author(author, ca) for ca in corresponding_authors):
-            # 使用改进的名称匹配识别通讯作者
-            marked_authors.append(f"{author}*")
-        else:
-            marked_authors.append(author)
-    
-    return '; '.join(marked_authors)
-
-# Apply the function to create a new column
-df['标记作者'] = df.apply(lambda row: mark_corresponding_authors(row), axis=1)
+    return first_names_match(first_name1, first_name2)
 
-# Replace the original authors column with the marked version
-df['全部论文作者'] = df['标记作者']
-df.drop('标记作者', axis=1, inplace=True)
+# Mark corresponding authors with an asterisk for the whole DataFrame at once
+def mark_corresponding_authors(df, registry=None):
+    """Return the marked '全部论文作者' column.
 
-# 删除"通讯作者"和"处理状态"两列
-if '通讯作者' in df.columns:
-    df.drop('通讯作者', axis=1, inplace=True)
-    print("已删除'通讯作者'列")
+    Names are interned in an AuthorRegistry, so every distinct name is
+    normalized once and authors are compared by integer ID. Pass the same
+    registry for every chunk of a file to share the interned names and the
+    cached is_same_author results between chunks. Names without a comma
+    are interned by their exact spelling, since is_same_author only
+    matches them when the strings are identical.
+    """
+    import pandas as pd
+    from author_registry import AuthorRegistry
+    from title_normalizer import is_missing
+    if registry is None:
+        registry = AuthorRegistry(exact_plain_names=True)
+    marked = []
+    for authors, corr in zip(df['全部论文作者'], df['通讯作者']):
+        if is_missing(corr):
+            marked.append(authors)
+            continue
+        # Empty names are kept: like is_same_author, an empty author only matches an empty corresponding entry
+        candidates = registry.candidates([registry.intern(name.strip()) for name in str(corr).split(';')])
+        names = [name.strip() for name in str(authors).split(';')]
+        # 检查作者名字是否已经有星号标记，已有星号的直接保留
+        marked.append('; '.join(
+            name + '*' if not name.endswith('*') and registry.matches(registry.intern(name), candidates)
+            else name
+            for name in names
+        ))
+    return pd.Series(marked, index=df.index, name='全部论文作者', dtype=object)
 
-if '处理状态' in df.columns:
-    df.drop('处理状态', axis=1, inplace=True)
-    print("已删除'处理状态'列")
+# Stream the input in chunks, mark each chunk and write it out right away,
+# so peak memory depends on the chunk size rather than on the input size
+def mark_file(input_file, output_file, chunk_size=10000):
+    # 删除"通讯作者"和"处理状态"两列
+    header = read_header(input_file)
+    out_header = [column for column in header if column not in ('通讯作者', '处理状态')]
+    for column in ('通讯作者', '处理状态'):
+        if column in header:
+            print(f"已删除'{column}'列")
+    
+    # One registry for the whole file: names repeat across chunks
+    from author_registry import AuthorRegistry
+    registry = AuthorRegistry(exact_plain_names=True)
+    with TableWriter(output_file, out_header) as writer:
+        for chunk in iter_chunks(input_file, chunk_size):
+            # Replace the original authors column with the marked version
+            chunk['全部论文作者'] = mark_corresponding_authors(chunk, registry)
+            for values in chunk[out_header].itertuples(index=False):
+                writer.write_row(values)
 
-# Save the updated data
-df.to_excel('paper_with_authors_updated.xlsx', index=False)
+# Default input: the most recent spider.py output, columnar intermediates included
+def default_input():
+    candidates = [path for path in ['paper_with_authors_final.parquet', 'paper_with_authors_final.arrow',
+                                    'paper_with_authors_final.xlsx'] if os.path.exists(path)]
+    if not candidates:
+        return 'paper_with_authors_final.xlsx'
+    return max(candidates, key=os.path.getmtime)
 
-print("处理完成。通讯作者已在'全部论文作者'列中用星号(*)标记。")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='在全部论文作者列中用星号(*)标记通讯作者')
+    parser.add_argument('--input', type=str, default=None,
+                        help='爬虫输出文件，支持 parquet/arrow/xlsx/csv/tsv '
+                             '(默认: 最新的 paper_with_authors_final.parquet/.arrow/.xlsx)')
+    parser.add_argument('--output', type=str, default='paper_with_authors_updated.xlsx',
+                        help='标记后的输出文件，支持 xlsx/csv/tsv/parquet/arrow (默认: paper_with_authors_updated.xlsx)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='每次读入内存的行数 (默认: 10000)')
+    args = parser.parse_args()
+    
+    mark_file(args.input or default_input(), args.output, args.chunk_size)
+    
+    print("处理完成。通讯作者已在'全部论文作者'列中用星号(*)标记。")
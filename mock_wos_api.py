@@ -0,0 +1,147 @@
+import re
+import sys
+import json
+import time
+import threading
+import argparse
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 本地模拟的 Web of Science Expanded API，用于在没有网络和API Key的情况下测试 API 后端
+#
+# 记录文件为JSON列表，每项: {"title": 文章标题, "corresponding": ["姓, 名", ...], "uid": 可选}
+# 也可以直接从输入表格生成记录，每篇文章的第一作者作为通讯作者
+
+mock_api_key = 'mock-key'
+
+def _title_words(title):
+    return set(re.findall(r'[^\W_]+', str(title).lower()))
+
+def _api_record(record, seq):
+    names = [{'seq_no': i, 'role': 'author', 'full_name': name, 'display_name': name}
+             for i, name in enumerate(record.get('corresponding', []), 1)]
+    return {
+        'UID': record.get('uid') or f'WOS:MOCK{seq:09d}',
+        'static_data': {
+            'summary': {'titles': {'count': 1, 'title': [{'type': 'item', 'content': record['title']}]}},
+            'fullrecord_metadata': {
+                # 只有一个通讯地址时与真实接口一样返回对象而不是列表
+                'reprint_addresses': {'count': 1, 'address_name': {
+                    'address_spec': {'full_address': 'Mock University'},
+                    'names': {'count': len(names), 'name': names[0] if len(names) == 1 else names},
+                }} if names else {'count': 0},
+            },
+        },
+    }
+
+def records_from_sheet(path):
+    """从输入表格生成模拟记录：论文题目为标题，全部论文作者中的第一位为通讯作者"""
+    from table_io import read_columns
+    df = read_columns(path, ['论文题目', '全部论文作者'])
+    records = []
+    for title, authors in zip(df['论文题目'], df.get('全部论文作者', [None] * len(df))):
+        if title is None:
+            continue
+        first_author = str(authors).split(';')[0].strip() if authors is not None else ''
+        records.append({'title': str(title), 'corresponding': [first_author] if first_author else []})
+    return records
+
+class MockWosApi:
+    """按 TI=(...) OR TI=(...) 查询中的标题检索记录：标题包含查询中的全部单词即为命中（忽略大小写和标点），
+    与WOS一样，去掉 and / or / not 和括号内容后的标题仍能检索到原文章"""
+
+    def __init__(self, records, api_key=mock_api_key, latency=0.0):
+        self.api_key = api_key
+        self.latency = latency  # 每次请求响应前等待的秒数
+        self.records = [_api_record(record, seq) for seq, record in enumerate(records, 1)]
+        # 倒排索引: {单词: 包含该单词的记录位置集合}
+        self.index = {}
+        for pos, record in enumerate(records):
+            for word in _title_words(record['title']):
+                self.index.setdefault(word, set()).add(pos)
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def search(self, query, first_record, count):
+        positions = set()
+        for title in re.findall(r'TI=\((.*?)\)(?=\s+OR\s+TI=\(|\s*$)', query):
+            words = _title_words(title)
+            if words:
+                positions |= set.intersection(*(self.index.get(word, set()) for word in words))
+        matched = [self.records[pos] for pos in sorted(positions)]
+        page = matched[first_record - 1:first_record - 1 + count]
+        return {
+            'QueryResult': {'QueryID': 1, 'RecordsSearched': len(self.records), 'RecordsFound': len(matched)},
+            'Data': {'Records': {'records': {'REC': page} if page else ''}},
+        }
+
+def _make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持长连接
+
+        def do_GET(self):
+            with api.lock:
+                api.request_count += 1
+            url = urlparse(self.path)
+            params = {name: values[0] for name, values in parse_qs(url.query).items()}
+            if self.headers.get('X-ApiKey') != api.api_key:
+                return self._reply(401, {'message': 'Invalid API key'})
+            if not url.path.rstrip('/').endswith('/api/wos') or 'usrQuery' not in params:
+                return self._reply(404, {'message': 'Not found'})
+            count = min(int(params.get('count', 10)), 100)
+            first_record = max(int(params.get('firstRecord', 1)), 1)
+            if api.latency > 0:
+                time.sleep(api.latency)
+            self._reply(200, api.search(params['usrQuery'], first_record, count))
+
+        def _reply(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # 不在控制台逐条打印请求
+
+    return Handler
+
+def start_mock_server(records, host='127.0.0.1', port=0, api_key=mock_api_key, latency=0.0):
+    """在后台线程启动模拟服务，返回 (server, 检索接口地址)，用完调用 server.shutdown()
+
+    port为0时自动选择空闲端口；server.api.request_count 为收到的请求数
+    """
+    api = MockWosApi(records, api_key, latency)
+    server = ThreadingHTTPServer((host, port), _make_handler(api))
+    server.daemon_threads = True
+    server.api = api
+    threading.Thread(target=server.serve_forever, name='mock-wos-api', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/api/wos'
+
+# 启动本地模拟API，然后运行:
+#   python spider.py --backend api --api-url http://127.0.0.1:8765/api/wos --api-key mock-key
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地模拟的 Web of Science API')
+    parser.add_argument('--records', type=str, default=None, help='JSON记录文件')
+    parser.add_argument('--from-sheet', type=str, default=None, help='从输入表格生成记录，例如 paper.xlsx')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--api-key', type=str, default=mock_api_key)
+    parser.add_argument('--latency', type=float, default=0.0, help='每次请求响应前等待的秒数 (默认: 0)')
+    args = parser.parse_args()
+
+    if args.records:
+        with open(args.records, encoding='utf-8') as f:
+            mock_records = json.load(f)
+    elif args.from_sheet:
+        mock_records = records_from_sheet(args.from_sheet)
+    else:
+        parser.error('需要 --records 或 --from-sheet')
+
+    server, url = start_mock_server(mock_records, port=args.port, api_key=args.api_key, latency=args.latency)
+    print(f"模拟API已启动: {url} (API Key: {args.api_key})，共 {len(mock_records)} 条记录，Ctrl+C 退出")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
@@ -0,0 +1,176 @@
+import re
+import sys
+import json
+import time
+import html
+import random
+import threading
+import argparse
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from mock_wos_api import _title_words, records_from_sheet
+
+# 本地模拟的 Web of Science 网页（高级检索页、检索结果列表、文章详情页），用于离线测试和基准测试 spider.py
+#
+# 页面使用与 spider.py 相同的元素ID和选择器:
+#   高级检索页  #advancedSearchInputArea, button[data-ta="run-search"], Cookie弹窗 #onetrust-accept-btn-handler
+#   结果列表    a.title.title-link[data-ta="summary-record-title-link"]，没有结果时为 .search-error 提示
+#   详情页      .author-info-section.ng-star-inserted, [id^="FRAiinTa-RepAddrTitle-"], span.value.section-label-data
+# 记录格式与 mock_wos_api.py 相同: {"title": 文章标题, "corresponding": ["姓, 名", ...]}
+
+search_path = '/wos/woscc/advanced-search'
+summary_path = '/wos/woscc/summary'
+record_path = '/wos/woscc/full-record/'
+
+# 检索式中的标题: TI=(...) OR TI=(...) 的批量检索，或 TI=... 的逐篇检索
+query_title_pattern = re.compile(r'TI=\((.*?)\)(?=\s+OR\s+TI=\(|\s*$)')
+
+def query_titles(query):
+    titles = query_title_pattern.findall(query)
+    if titles:
+        return titles
+    return [query[3:]] if query.startswith('TI=') else [query]
+
+def _page(title, body):
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head>'
+            f'<body>{body}</body></html>')
+
+class MockWosSite:
+    """按检索式中的标题检索记录：标题包含查询中的全部单词即为命中（忽略大小写和标点）
+
+    参数:
+    records: 记录列表
+    latency: 每个页面响应前等待的秒数，模拟网络和页面渲染耗时
+    jitter: 在latency之上再随机增加 0~jitter 秒
+    """
+
+    def __init__(self, records, latency=0.0, jitter=0.0):
+        self.records = list(records)
+        self.latency = latency
+        self.jitter = jitter
+        # 倒排索引: {单词: 包含该单词的记录位置集合}
+        self.index = {}
+        for pos, record in enumerate(self.records):
+            for word in _title_words(record['title']):
+                self.index.setdefault(word, set()).add(pos)
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def search(self, query):
+        positions = set()
+        for title in query_titles(query):
+            words = _title_words(title)
+            if words:
+                positions |= set.intersection(*(self.index.get(word, set()) for word in words))
+        return sorted(positions)
+
+    def delay(self):
+        seconds = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def search_page(self):
+        return _page('Advanced Search', (
+            '<div id="onetrust-banner-sdk">'
+            '<button id="onetrust-accept-btn-handler" '
+            'onclick="document.getElementById(\'onetrust-banner-sdk\').style.display=\'none\'">Accept</button>'
+            '</div>'
+            f'<form action="{summary_path}" method="get">'
+            '<textarea id="advancedSearchInputArea" name="q" rows="4" cols="80"></textarea>'
+            '<button type="submit" data-ta="run-search">Search</button>'
+            '</form>'
+        ))
+
+    def summary_page(self, query):
+        links = ''.join(
+            f'<div class="summary-record"><a class="title title-link" data-ta="summary-record-title-link" '
+            f'href="{record_path}{pos}">{html.escape(self.records[pos]["title"])}</a></div>'
+            for pos in self.search(query)
+        )
+        if not links:
+            links = '<div class="search-error">Your search found no results</div>'
+        return _page('Results', f'<div class="results">{links}</div>')
+
+    def record_page(self, pos):
+        record = self.records[pos]
+        names = ''.join(
+            f'<span class="value section-label-data">{html.escape(name)} (corresponding author)</span>'
+            for name in record.get('corresponding', [])
+        )
+        section = (f'<div class="author-info-section ng-star-inserted">'
+                   f'<span id="FRAiinTa-RepAddrTitle-0">Corresponding Address</span>{names}</div>') if names else ''
+        return _page(record['title'], f'<h2 class="title">{html.escape(record["title"])}</h2>{section}')
+
+def _make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持长连接
+
+        def do_GET(self):
+            with site.lock:
+                site.request_count += 1
+            url = urlparse(self.path)
+            params = {name: values[0] for name, values in parse_qs(url.query).items()}
+            path = url.path.rstrip('/')
+            if path == search_path:
+                body = site.search_page()
+            elif path == summary_path:
+                body = site.summary_page(params.get('q', ''))
+            elif path.startswith(record_path) and path[len(record_path):].isdigit() \
+                    and int(path[len(record_path):]) < len(site.records):
+                body = site.record_page(int(path[len(record_path):]))
+            else:
+                return self._reply(404, _page('Not found', 'Not found'))
+            site.delay()
+            self._reply(200, body)
+
+        def _reply(self, status, body):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # 不在控制台逐条打印请求
+
+    return Handler
+
+def start_mock_site(records, host='127.0.0.1', port=0, latency=0.0, jitter=0.0):
+    """在后台线程启动模拟网站，返回 (server, 高级检索页面地址)，用完调用 server.shutdown()
+
+    port为0时自动选择空闲端口；server.site.request_count 为收到的请求数
+    """
+    site = MockWosSite(records, latency, jitter)
+    server = ThreadingHTTPServer((host, port), _make_handler(site))
+    server.daemon_threads = True
+    server.site = site
+    threading.Thread(target=server.serve_forever, name='mock-wos-site', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}{search_path}'
+
+# 启动本地模拟网站，然后运行:
+#   python spider.py --base-url http://127.0.0.1:8766/wos/woscc/advanced-search --rate-limit 0
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='本地模拟的 Web of Science 网页')
+    parser.add_argument('--records', type=str, default=None, help='JSON记录文件')
+    parser.add_argument('--from-sheet', type=str, default=None, help='从输入表格生成记录，例如 paper.xlsx')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个页面响应前等待的秒数 (默认: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='在 --latency 之上随机增加的最大秒数 (默认: 0)')
+    args = parser.parse_args()
+
+    if args.records:
+        with open(args.records, encoding='utf-8') as f:
+            mock_records = json.load(f)
+    elif args.from_sheet:
+        mock_records = records_from_sheet(args.from_sheet)
+    else:
+        parser.error('需要 --records 或 --from-sheet')
+
+    server, url = start_mock_site(mock_records, port=args.port, latency=args.latency, jitter=args.jitter)
+    print(f"模拟网站已启动: {url}，共 {len(mock_records)} 条记录，Ctrl+C 退出")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
@@ -0,0 +1,70 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+import tempfile
+from record_parser import parse_record
+
+# 内容寻址的详情页存档：每个页面按内容的SHA-256保存为一个gzip文件，
+# 相同内容只保存一份；index.jsonl 记录每篇文章对应的页面
+class PageStore:
+    """保存抓取到的文章详情页，供清洗规则变化后离线重新提取
+
+    目录结构:
+    objects/ab/abcdef....html.gz   页面内容
+    index.jsonl                    {"key": 行键, "row": 行号, "digest": 页面摘要, "time": 时间}
+    """
+
+    def __init__(self, root='page_store'):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self.lock = threading.Lock()  # 多个浏览器线程共用一个索引文件
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest + '.html.gz')
+
+    def save(self, html, key, row):
+        """保存页面并记录索引，返回页面摘要"""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，避免中断时留下不完整的页面
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(data))
+            os.replace(tmp_path, path)
+
+        record = {'key': key, 'row': row, 'digest': digest, 'time': time.time()}
+        with self.lock:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return digest
+
+    def load_index(self):
+        """返回 {行键: 最新的页面摘要}
+
+        行键有DOI或UT时为DOI/UT，否则为标题键（见 dedup.row_key），同名但DOI不同的文章各自对应自己的页面
+        """
+        latest = {}
+        if not os.path.exists(self.index_path):
+            return latest
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 中断时最后一行可能不完整
+                if record['key']:
+                    latest[record['key']] = record['digest']
+        return latest
+
+# 进程池中的任务：读取并解析一个存档页面，返回 (摘要, 通讯作者列表)
+def reparse_object(args):
+    root, digest = args
+    with gzip.open(os.path.join(root, 'objects', digest[:2], digest + '.html.gz'), 'rt', encoding='utf-8') as f:
+        return digest, parse_record(f.read())
@@ -0,0 +1,59 @@
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 只追加的进度日志：每篇文章处理完立即写入一行JSON，崩溃时最多丢失一行
+class ProgressJournal:
+    """以JSON Lines格式逐行记录每篇文章的处理结果
+
+    参数:
+    path: 日志文件路径
+    reset: 为True时清空已有日志重新开始，否则在末尾继续追加
+    """
+
+    def __init__(self, path='paper_with_authors_progress.jsonl', reset=False):
+        self.path = path
+        self.file = open(path, 'w' if reset else 'a', encoding='utf-8')
+
+    def append(self, row, key, status, authors='', failure=None, attempts=None):
+        """追加一篇文章的结果，并立即落盘
+
+        failure为失败类别，成功时为None；attempts为到目前为止各失败类别的次数 {类别: 次数}，
+        断点续爬时据此继续计算剩余的重试次数
+        """
+        record = {'row': row, 'key': key, 'status': status, 'authors': authors, 'failure': failure,
+                  'attempts': dict(attempts or {}), 'time': time.time()}
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+# 读取进度日志，同一篇文章的多条记录以最后一条为准
+def replay_journal(path='paper_with_authors_progress.jsonl'):
+    """返回 {行键: 记录}，日志不存在时返回空字典
+
+    按行键（有DOI或UT时为DOI/UT，否则为标题键，见 dedup.row_key）而不是行号合并，
+    两次运行之间输入文件的行顺序变化时，不同文章的记录不会互相覆盖
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 崩溃时最后一行可能只写了一半
+                logger.warning(f"进度日志第{line_no}行不完整，已忽略")
+                continue
+            records[record['key']] = record
+    return records
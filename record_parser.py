@@ -0,0 +1,123 @@
+import sys
+from html.parser import HTMLParser
+
+# 没有结束标签的HTML元素
+void_elements = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+
+# 通讯作者名中不应出现的机构类词语
+non_person_words = ['univ', 'school', 'institute', 'dept']
+
+# 解析文章详情页的HTML，收集作者信息区域中的通讯作者组和作者名
+class RecordPageParser(HTMLParser):
+    """对应原来的三个选择器:
+    .author-info-section.ng-star-inserted  作者信息区域
+    [id^="FRAiinTa-RepAddrTitle-"]         区域内的通讯作者组
+    span.value.section-label-data          区域内的作者名
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.sections = []       # 每个区域: {'addr_titles': 通讯作者组数, 'names': [作者名]}
+        self.stack = []          # 已打开的元素: (标签名, 区域或None, 文本缓冲或None)
+        self.open_sections = []  # 当前所在的作者信息区域（由外到内）
+        self.open_names = []     # 当前正在收集文本的作者名元素
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        element_id = attrs.get('id') or ''
+
+        section = None
+        if 'author-info-section' in classes and 'ng-star-inserted' in classes:
+            section = {'addr_titles': 0, 'names': []}
+            self.sections.append(section)
+
+        if element_id.startswith('FRAiinTa-RepAddrTitle-'):
+            for open_section in self.open_sections:
+                open_section['addr_titles'] += 1
+
+        text = None
+        if tag == 'span' and 'value' in classes and 'section-label-data' in classes and self.open_sections:
+            text = []
+
+        if tag in void_elements:
+            return
+        self.stack.append((tag, section, text))
+        if section is not None:
+            self.open_sections.append(section)
+        if text is not None:
+            self.open_names.append(text)
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> 这类自闭合写法只计入属性，不会产生文本
+        self.handle_starttag(tag, attrs)
+        if tag not in void_elements:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # 容忍未闭合的元素：一直弹出到匹配的开始标签
+        if not any(open_tag == tag for open_tag, _, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, section, text = self.stack.pop()
+            if section is not None:
+                self.open_sections.pop()
+            if text is not None:
+                self.open_names.pop()
+                name = ' '.join(''.join(text).split())
+                for open_section in self.open_sections:
+                    open_section['names'].append(name)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for text in self.open_names:
+            text.append(data)
+
+def parse_author_sections(html):
+    """返回详情页中每组通讯作者对应的原始作者文本（清洗前），顺序与页面一致"""
+    parser = RecordPageParser()
+    parser.feed(html)
+    parser.close()
+
+    raw_names = []
+    for section in parser.sections:
+        # 每个通讯作者组都对应区域内的全部作者名，重复的名字在清洗时去掉
+        for _ in range(section['addr_titles']):
+            raw_names.extend(name for name in section['names'] if name)
+    return raw_names
+
+def clean_corresponding_authors(raw_names):
+    """使用分号和(corresponding author)作为分隔符清洗作者文本，返回去重后的 "姓, 名" 列表"""
+    cleaned_authors = []
+
+    # 将所有作者信息连接成一个字符串，按照(corresponding author)拆分
+    all_authors_text = '; '.join(raw_names)
+    for segment in all_authors_text.split('(corresponding author)'):
+        # 按分号拆分
+        for name in segment.split(';'):
+            name = name.strip()
+            # 检查是否像一个人名 (通常是 "姓, 名" 格式)
+            if ',' in name and len(name.split(',')) == 2:
+                last_name = name.split(',')[0].strip()
+                first_name = name.split(',')[1].strip()
+                # 确保姓和名都不为空且不含有明显的非人名信息
+                if (last_name and first_name and
+                        not any(x in name.lower() for x in non_person_words)):
+                    cleaned_authors.append(name)
+
+    # 去重
+    return list(dict.fromkeys(cleaned_authors))
+
+def parse_record(html):
+    """从文章详情页HTML中提取通讯作者，不依赖浏览器，可用于离线重新解析保存的页面"""
+    return clean_corresponding_authors(parse_author_sections(html))
+
+# 离线解析保存的详情页: python record_parser.py page1.html page2.html ...
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        with open(path, encoding='utf-8') as f:
+            print(f"{path}\t{'; '.join(parse_record(f.read()))}")
@@ -0,0 +1,62 @@
+import sqlite3
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 本地通讯作者结果缓存，避免重复检索已经爬取过的文章
+class ResultCache:
+    """基于SQLite的结果缓存，键为规范化标题或DOI，值为通讯作者字符串
+
+    参数:
+    path: 缓存数据库文件路径
+    ttl_days: 缓存有效天数，过期条目不再命中，并在打开缓存时清除
+    refresh: 为True时忽略已有缓存（仍会写入新结果），用于强制重新爬取
+    """
+
+    def __init__(self, path='author_cache.sqlite', ttl_days=180, refresh=False):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.refresh = refresh
+        self.hits = 0
+        # 连接可能在创建它的线程之外使用（流水线的io线程），但同一时间只有一个线程访问
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, authors TEXT NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        self.conn.commit()
+        self.purge_expired()
+
+    def purge_expired(self):
+        """删除超过有效期的缓存条目"""
+        cursor = self.conn.execute('DELETE FROM results WHERE fetched_at < ?', (time.time() - self.ttl,))
+        self.conn.commit()
+        if cursor.rowcount:
+            logger.info(f"已清除{cursor.rowcount}条过期缓存")
+
+    def get(self, keys):
+        """按顺序查找多个键，返回第一个未过期的通讯作者字符串，未命中时返回None"""
+        if self.refresh:
+            return None
+        min_time = time.time() - self.ttl
+        for key in keys:
+            row = self.conn.execute(
+                'SELECT authors FROM results WHERE key = ? AND fetched_at >= ?', (key, min_time)
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                return row[0]
+        return None
+
+    def put(self, keys, authors):
+        """把同一篇文章的结果写到它的所有键下"""
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO results (key, authors, fetched_at) VALUES (?, ?, ?)',
+            [(key, authors, now) for key in keys]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,175 @@
+import time
+import heapq
+import random
+import logging
+import asyncio
+from collections import deque, Counter
+
+logger = logging.getLogger(__name__)
+
+# 失败类别及默认重试次数（每篇文章每个类别最多重试几次）
+#   no_hit      结果页显示没有找到结果，通常是标题本身的问题，重试也不会变，默认不重试
+#   batch_miss  批量检索中未匹配到，改为逐篇检索重试一次，不等待
+#   timeout     页面加载或等待超时、浏览器无响应，多为临时问题
+#   parse_error 详情页已打开但没有提取到通讯作者
+#   error       其他异常（验证码、点击失败等）
+default_retry_budgets = {
+    'no_hit': 0,
+    'batch_miss': 1,
+    'timeout': 3,
+    'parse_error': 1,
+    'error': 2,
+}
+
+# 这些类别的重试立即进行，不做退避
+immediate_classes = {'batch_miss'}
+
+def parse_retry_budgets(text):
+    """解析命令行中的重试次数设置，例如 'timeout=5,no_hit=1'，返回完整的 {类别: 次数}"""
+    budgets = dict(default_retry_budgets)
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, sep, value = item.partition('=')
+        name = name.strip()
+        if not sep or name not in budgets:
+            raise ValueError(f"无效的重试设置: {item}，可用类别: {', '.join(budgets)}")
+        budgets[name] = int(value)
+        if budgets[name] < 0:
+            raise ValueError(f"重试次数不能为负数: {item}")
+    return budgets
+
+# 重试调度器：失败的文章按类别决定是否重试，重试任务按指数退避的时间插回主队列
+class RetryScheduler:
+    """在同一个任务队列中交替处理新任务和到期的重试任务，不再等第一轮全部结束后再跑第二轮
+
+    任务是文章序号列表（单篇或一批），由上游阶段通过 put() 陆续加入，全部加入后调用 close_input()。
+    取任务时优先返回已到期的重试，其次是新任务；只剩未到期的重试时等待到期。
+    输入已结束、所有任务都已取出、且取出的文章都有了结果时，get() 返回None。
+    所有方法都在同一个事件循环中调用。
+
+    参数:
+    budgets: {失败类别: 每篇文章最多重试次数}，未列出的类别不重试
+    base_delay: 第一次重试前等待的秒数，之后每次翻倍
+    max_delay: 单次等待的上限（秒）
+    max_pending: 等待处理的新任务上限，达到上限时 put() 等待，向上游施加背压
+    """
+
+    def __init__(self, budgets=None, base_delay=30, max_delay=600, max_pending=100):
+        self.budgets = dict(default_retry_budgets if budgets is None else budgets)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+
+        self.fresh = deque()
+        self.retries = []           # 堆: (到期时间, 序号, 任务)
+        self.sequence = 0
+        self.outstanding = 0        # 已取出但还没有结果的文章数
+        self.input_closed = False
+        self.abandoned = False      # 已没有工作者处理任务，之后加入的任务直接放入 dropped
+        self.dropped = []
+        self.attempts = {}          # {序号: Counter(失败类别: 次数)}
+        self.final_failures = {}    # {序号: 最后一次失败的类别}
+        # 在事件循环中第一次用到时才创建：Python 3.9及以前，在 asyncio.run() 之外创建的Event绑定到另一个事件循环
+        self.changed = None
+
+    async def put(self, task):
+        """加入一个新任务，等待处理的新任务过多时等待"""
+        while len(self.fresh) >= self.max_pending and not self.abandoned:
+            await self._wait_changed()
+        if self.abandoned:
+            self.dropped.extend(task)
+            return
+        self.fresh.append(task)
+        self._notify()
+
+    def add_retry(self, idx, delay=0, attempts=None):
+        """加入一篇需要重试的文章（例如断点续爬恢复的失败文章）
+
+        attempts为之前各失败类别已用掉的次数 {类别: 次数}，重试次数在此基础上继续计算
+        """
+        if attempts:
+            self.attempts[idx] = Counter(attempts)
+        self._push_retry([idx], delay)
+
+    def close_input(self):
+        """上游不会再加入新任务"""
+        self.input_closed = True
+        self._notify()
+
+    async def get(self):
+        """取出下一个任务，没有剩余工作时返回None"""
+        while True:
+            now = time.monotonic()
+            if self.retries and self.retries[0][0] <= now:
+                task = heapq.heappop(self.retries)[2]
+            elif self.fresh:
+                task = self.fresh.popleft()
+            elif self.retries or self.outstanding or not self.input_closed:
+                # 等待最近的重试到期、上游加入新任务，或其他工作者的结果产生新的重试
+                await self._wait_changed(self.retries[0][0] - now if self.retries else None)
+                continue
+            else:
+                return None
+            self.outstanding += len(task)
+            self._notify()
+            return task
+
+    def resolve(self, idx, success, failure=None):
+        """记录一篇文章的结果，失败且还有重试次数时安排重试
+
+        返回True表示已安排重试，False表示这篇文章已有最终结果
+        """
+        self.outstanding -= 1
+        retry = False
+        if success:
+            self.final_failures.pop(idx, None)
+        else:
+            failure = failure or 'error'
+            counts = self.attempts.setdefault(idx, Counter())
+            counts[failure] += 1
+            if counts[failure] <= self.budgets.get(failure, 0) and not self.abandoned:
+                delay = 0 if failure in immediate_classes else self.backoff(sum(counts.values()))
+                self._push_retry([idx], delay)
+                logger.info(f"第 {idx+1} 篇文章失败({failure})，{delay:.0f}秒后第{counts[failure]}次重试")
+                retry = True
+            else:
+                self.final_failures[idx] = failure
+        self._notify()
+        return retry
+
+    def backoff(self, attempt):
+        """第attempt次失败后的等待秒数：指数增长，带少量随机抖动避免多篇文章同时重试"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def abandon(self):
+        """所有工作者都已退出时调用：取出所有尚未处理的文章序号，之后加入的任务不再排队"""
+        self.abandoned = True
+        indices = self.dropped + [idx for task in self.fresh for idx in task]
+        indices += [idx for _, _, task in self.retries for idx in task]
+        self.dropped = []
+        self.fresh.clear()
+        self.retries = []
+        self._notify()
+        return indices
+
+    def failure_summary(self):
+        """最终失败文章按类别的计数"""
+        return Counter(self.final_failures.values())
+
+    def _push_retry(self, task, delay):
+        self.sequence += 1
+        heapq.heappush(self.retries, (time.monotonic() + delay, self.sequence, task))
+        self._notify()
+
+    def _notify(self):
+        if self.changed is not None:
+            self.changed.set()
+
+    async def _wait_changed(self, timeout=None):
+        if self.changed is None:
+            self.changed = asyncio.Event()
+        self.changed.clear()
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
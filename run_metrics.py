@@ -0,0 +1,197 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+quantiles = [0.5, 0.95, 0.99]
+
+def percentile(sorted_values, q):
+    """最近秩法百分位数，sorted_values需已排序且非空"""
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def format_duration(seconds):
+    if seconds is None:
+        return '未知'
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}小时{minutes}分{seconds}秒"
+
+# 运行指标：每一步的耗时（单调时钟）逐条写入JSON Lines文件，并汇总百分位数、速度和预计剩余时间
+class RunMetrics:
+    """记录各阶段耗时和整体进度，可在多个线程中同时使用
+
+    指标文件每行一条: {"stage": 阶段, "row": 行号或null, "seconds": 耗时, "time": 结束时刻, "error": 是否出错}
+
+    参数:
+    path: 指标文件路径，为None时只在内存中汇总
+    report_interval: 两次进度日志之间至少间隔的秒数
+    """
+
+    def __init__(self, path='scraper_metrics.jsonl', report_interval=60):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8') if path else None
+        self.report_interval = report_interval
+        self.lock = threading.Lock()
+        self.durations = {}      # {阶段: [耗时]}
+        self.started = time.monotonic()
+        self.rows_queued = 0     # 需要处理的行数（开始前按分片和断点续爬状态算出）
+        self.rows_finished = 0   # 已有最终结果的行数
+        self.last_report = self.started
+
+    @contextmanager
+    def span(self, stage, row=None):
+        """计时一个步骤，出错时同样记录耗时"""
+        start = time.monotonic()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(stage, time.monotonic() - start, row, error)
+
+    def record(self, stage, seconds, row=None, error=False):
+        with self.lock:
+            self.durations.setdefault(stage, []).append(seconds)
+            if self.file is not None:
+                self.file.write(json.dumps({'stage': stage, 'row': row, 'seconds': round(seconds, 6),
+                                            'time': time.time(), 'error': error}) + '\n')
+
+    def queue_rows(self, count=1):
+        with self.lock:
+            self.rows_queued += count
+
+    def finish_row(self):
+        """记录一行得到最终结果，距上次进度日志超过间隔时返回True"""
+        with self.lock:
+            self.rows_finished += 1
+            now = time.monotonic()
+            if now - self.last_report >= self.report_interval:
+                self.last_report = now
+                return True
+            return False
+
+    def progress(self):
+        """返回 (已完成行数, 剩余行数, 每小时行数, 预计剩余秒数)"""
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            finished = self.rows_finished
+            remaining = max(self.rows_queued - finished, 0)
+        rows_per_hour = finished / elapsed * 3600 if elapsed > 0 else 0.0
+        eta = remaining / rows_per_hour * 3600 if rows_per_hour > 0 else None
+        return finished, remaining, rows_per_hour, eta
+
+    def stage_summary(self):
+        """返回 {阶段: {'count', 'total', 'p50', 'p95', 'p99'}}"""
+        with self.lock:
+            durations = {stage: sorted(values) for stage, values in self.durations.items()}
+        summary = {}
+        for stage, values in durations.items():
+            summary[stage] = {'count': len(values), 'total': sum(values)}
+            for q in quantiles:
+                summary[stage][f'p{int(q * 100)}'] = percentile(values, q)
+        return summary
+
+    def summary(self):
+        finished, remaining, rows_per_hour, eta = self.progress()
+        return {
+            'elapsed_seconds': time.monotonic() - self.started,
+            'rows_finished': finished,
+            'rows_remaining': remaining,
+            'rows_per_hour': rows_per_hour,
+            'eta_seconds': eta,
+            'stages': self.stage_summary(),
+        }
+
+    def progress_line(self):
+        finished, remaining, rows_per_hour, eta = self.progress()
+        return (f"进度: 已完成 {finished} 篇, 剩余 {remaining} 篇, "
+                f"速度 {rows_per_hour:.0f} 篇/小时, 预计剩余 {format_duration(eta)}")
+
+    def summary_lines(self):
+        """各阶段耗时汇总表，用于写入日志"""
+        lines = [f"{'阶段':<18}{'次数':>8}{'总耗时(s)':>12}{'p50(s)':>10}{'p95(s)':>10}{'p99(s)':>10}"]
+        stages = sorted(self.stage_summary().items(), key=lambda item: -item[1]['total'])
+        for stage, values in stages:
+            lines.append(f"{stage:<18}{values['count']:>8}{values['total']:>12.2f}"
+                         f"{values['p50']:>10.3f}{values['p95']:>10.3f}{values['p99']:>10.3f}")
+        lines.append(self.progress_line())
+        return lines
+
+    def write_summary(self, path=None):
+        """把汇总写入JSON文件，默认与指标文件同名加 _summary 后缀"""
+        if path is None:
+            if not self.path:
+                return None
+            path = os.path.splitext(self.path)[0] + '_summary.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def prometheus_text(self):
+        """Prometheus文本格式的指标"""
+        finished, remaining, rows_per_hour, eta = self.progress()
+        lines = [
+            '# HELP authorminer_stage_seconds Duration of each scraping stage.',
+            '# TYPE authorminer_stage_seconds summary',
+        ]
+        for stage, values in sorted(self.stage_summary().items()):
+            for q in quantiles:
+                lines.append(f'authorminer_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f'{values[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'authorminer_stage_seconds_sum{{stage="{stage}"}} {values["total"]:.6f}')
+            lines.append(f'authorminer_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+        lines += [
+            '# HELP authorminer_rows_finished_total Rows with a final result.',
+            '# TYPE authorminer_rows_finished_total counter',
+            f'authorminer_rows_finished_total {finished}',
+            '# HELP authorminer_rows_remaining Rows still waiting for a result.',
+            '# TYPE authorminer_rows_remaining gauge',
+            f'authorminer_rows_remaining {remaining}',
+            '# HELP authorminer_rows_per_hour Average throughput since the run started.',
+            '# TYPE authorminer_rows_per_hour gauge',
+            f'authorminer_rows_per_hour {rows_per_hour:.3f}',
+            '# HELP authorminer_eta_seconds Estimated seconds until all queued rows are finished.',
+            '# TYPE authorminer_eta_seconds gauge',
+            f'authorminer_eta_seconds {eta if eta is not None else "NaN"}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+# 长时间运行时在后台提供 /metrics 接口，供Prometheus抓取
+def serve_prometheus(metrics, port, host='0.0.0.0'):
+    """在后台线程启动HTTP服务，返回server，用完调用 server.shutdown()"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            data = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Prometheus指标: http://{host}:{server.server_address[1]}/metrics")
+    return server
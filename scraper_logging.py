@@ -0,0 +1,115 @@
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 日志在后台线程写出：工作线程只把日志记录放入队列，文件和控制台的写入、格式化都由 QueueListener 线程完成，
+# 多个工作者同时记录日志时不再争抢文件锁，也不会因磁盘写入而阻塞
+#
+# 文本日志 scraper_log.txt 按大小滚动；另可写一个 JSON Lines 日志，每行一条记录，
+# 通过 extra 传入的字段（行号 row、事件 event、处理状态 status 等）原样保留，便于按行统计和检索
+
+text_format = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 日志详细程度: quiet 只记录警告和错误；normal 记录每篇文章的处理过程和结果；verbose 另外记录每一步操作和原始作者信息
+verbosity_levels = {
+    'quiet': logging.WARNING,
+    'normal': logging.INFO,
+    'verbose': logging.DEBUG,
+}
+
+# 逐行结果记录使用的logger，只写入JSON日志，不在文本日志和控制台中重复输出
+row_logger_name = 'authorminer.rows'
+
+# 第三方库在 verbose 下会逐条记录HTTP请求和浏览器命令，最多记录到INFO
+noisy_loggers = ['selenium', 'urllib3', 'asyncio']
+
+# LogRecord 自带的属性，其余属性都是通过 extra 传入的结构化字段
+_standard_attrs = set(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {'message', 'asctime'}
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条记录格式化为一行JSON: {"time", "level", "logger", "message", ...extra字段}"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in _standard_attrs)
+        # 经过队列的记录已由 QueueHandler 把异常格式化到 exc_text
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _not_row_record(record):
+    return record.name != row_logger_name
+
+_listener = None
+
+def setup_logging(log_file='scraper_log.txt', verbosity='normal', max_bytes=50 * 1024 * 1024, backup_count=5,
+                  json_file=None):
+    """设置日志：根logger只挂一个 QueueHandler，由后台线程写入文本日志、控制台和可选的JSON日志
+
+    参数:
+    log_file: 文本日志文件，超过 max_bytes 后滚动为 log_file.1 ... log_file.N
+    verbosity: quiet / normal / verbose，见 verbosity_levels
+    max_bytes: 单个日志文件的最大字节数，为0时不滚动
+    backup_count: 保留的旧日志文件个数
+    json_file: JSON Lines 日志文件，为None时不写，按相同的大小规则滚动
+
+    重复调用会先停止上一次启动的后台线程；程序退出时自动停止并写完队列中剩余的记录
+    """
+    global _listener
+    stop_logging()
+
+    text_formatter = logging.Formatter(text_format)
+    handlers = [
+        RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'),
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(text_formatter)
+        handler.addFilter(_not_row_record)
+    if json_file:
+        json_handler = RotatingFileHandler(json_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+
+    level = verbosity_levels[verbosity]
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    for name in noisy_loggers:
+        logging.getLogger(name).setLevel(max(level, logging.INFO))
+    # 逐行结果是JSON日志的主要内容，不受详细程度影响，quiet 下同样记录
+    logging.getLogger(row_logger_name).setLevel(logging.INFO)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def flush_logging():
+    """等待队列中已有的记录写完，之后再用print输出的内容不会与日志交错"""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+def stop_logging():
+    """停止后台写日志的线程，写完队列中剩余的记录并关闭日志文件"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+atexit.register(stop_logging)
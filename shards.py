@@ -0,0 +1,158 @@
+import os
+import re
+import hashlib
+import logging
+from table_io import iter_table, TableWriter
+
+logger = logging.getLogger(__name__)
+
+# 多台机器分片运行：按标题键的哈希把文章分到N片，每台机器只处理其中一片，最后按原始行顺序合并结果
+#
+# 分片结果文件在输入文件各列之后多出两列: 行号（输入文件中从1开始的行号）和 分片（如 "2/4"）
+
+row_column = '行号'
+shard_column = '分片'
+
+def parse_shard(text):
+    """解析 "i/N"（1 <= i <= N），返回 (i, N)"""
+    index, sep, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"无效的分片: {text}，应为 i/N，例如 1/4")
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"无效的分片: {text}，应满足 1 <= i <= N")
+    return index, count
+
+def shard_of(key, count):
+    """标题键所属的分片（从1开始）
+
+    使用blake2b而不是内置hash()，结果不受Python版本和PYTHONHASHSEED影响，
+    不同机器上对同一个输入文件得到相同的划分
+    """
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+def shard_mask(keys, index, count):
+    """每一行是否属于第index片"""
+    return [shard_of(key, count) == index for key in keys]
+
+def shard_label(index, count):
+    return f'{index}/{count}'
+
+def shard_path(path, index, count):
+    """分片的文件名: paper_with_authors_final.parquet → paper_with_authors_final_shard2of4.parquet"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}_shard{index}of{count}{ext}'
+
+shard_path_pattern = re.compile(r'_shard(\d+)of(\d+)$')
+
+def shard_from_path(path):
+    """从 shard_path 生成的文件名中取出分片 (i, N)，文件名没有分片后缀时返回None"""
+    match = shard_path_pattern.search(os.path.splitext(os.path.basename(path))[0])
+    if match is None:
+        return None
+    index, count = int(match.group(1)), int(match.group(2))
+    return (index, count) if 1 <= index <= count else None
+
+# 状态的优先级：同一行在多个分片文件中出现时，优先保留成功的结果
+def _status_rank(status):
+    return 1 if status == 'success' else 0
+
+def _comparable(values):
+    return [None if value is None else str(value) for value in values]
+
+def merge_shard_files(paths, output_file, conflicts_file=None):
+    """把各分片的结果文件按原始行顺序合并，返回 (写出的行数, 冲突列表)
+
+    同一行出现在多个文件中（被处理了两次）时：结果相同只保留一份；一个成功一个失败时保留成功的结果；
+    都成功但通讯作者不同时保留先读到的结果，记为冲突。冲突写入 conflicts_file（默认为输出文件名加 _conflicts.csv）。
+    同一行号的论文题目不同说明分片来自不同的输入文件，直接报错。
+    """
+    header = None
+    merged = {}       # {行号: (值列表, 来源文件)}
+    labels = set()
+    conflicts = []
+    duplicate_count = 0
+
+    for path in paths:
+        file_header, rows = iter_table(path)
+        if row_column not in file_header or shard_column not in file_header:
+            raise ValueError(f"{path} 不是分片结果文件（缺少 {row_column} 或 {shard_column} 列）")
+        data_header = [column for column in file_header if column not in (row_column, shard_column)]
+        if header is None:
+            header = data_header
+        elif data_header != header:
+            raise ValueError(f"{path} 的列与其他分片文件不一致")
+        positions = [file_header.index(column) for column in header]
+        row_pos = file_header.index(row_column)
+        shard_pos = file_header.index(shard_column)
+        title_pos = header.index('论文题目') if '论文题目' in header else None
+        status_pos = header.index('处理状态')
+        corr_pos = header.index('通讯作者')
+        # 分片从文件名取得：分到0行的分片文件没有数据行，但同样表示这一片已经完成
+        path_shard = shard_from_path(path)
+        if path_shard is not None:
+            labels.add(shard_label(*path_shard))
+
+        count = 0
+        for values in rows:
+            row_number = int(values[row_pos])
+            labels.add(str(values[shard_pos]))
+            data = [values[pos] for pos in positions]
+            count += 1
+            if row_number not in merged:
+                merged[row_number] = (data, path)
+                continue
+
+            existing, existing_path = merged[row_number]
+            duplicate_count += 1
+            if _comparable(existing) == _comparable(data):
+                continue
+            if title_pos is not None and _comparable([existing[title_pos]]) != _comparable([data[title_pos]]):
+                raise ValueError(f"第 {row_number} 行在 {existing_path} 和 {path} 中的论文题目不同，"
+                                 f"分片结果来自不同的输入文件")
+            if _status_rank(data[status_pos]) > _status_rank(existing[status_pos]):
+                merged[row_number] = (data, path)
+            elif _status_rank(data[status_pos]) == _status_rank(existing[status_pos]) == 1 \
+                    and _comparable([existing[corr_pos]]) != _comparable([data[corr_pos]]):
+                conflicts.append((row_number, existing_path, existing[corr_pos], path, data[corr_pos]))
+                logger.warning(f"第 {row_number} 行在两个分片中的通讯作者不同: {existing_path}: {existing[corr_pos]} / "
+                               f"{path}: {data[corr_pos]}，保留前者")
+        logger.info(f"已读取 {path}: {count} 行")
+
+    if header is None:
+        raise ValueError("没有要合并的分片文件")
+    _check_completeness(labels, merged)
+    if duplicate_count:
+        logger.warning(f"{duplicate_count} 行在多个分片文件中出现（被处理了两次）")
+
+    with TableWriter(output_file, header) as writer:
+        for row_number in sorted(merged):
+            writer.write_row(merged[row_number][0])
+    logger.info(f"已合并 {len(paths)} 个分片文件，共 {len(merged)} 行，写入 {output_file}")
+
+    if conflicts:
+        conflicts_file = conflicts_file or os.path.splitext(output_file)[0] + '_conflicts.csv'
+        with TableWriter(conflicts_file, [row_column, '保留的文件', '保留的通讯作者', '另一个文件', '另一个通讯作者']) as writer:
+            for conflict in conflicts:
+                writer.write_row(list(conflict))
+        logger.warning(f"{len(conflicts)} 行的通讯作者在不同分片中不一致，已写入 {conflicts_file}")
+    return len(merged), conflicts
+
+def _check_completeness(labels, merged):
+    """检查是否缺少分片，以及是否混用了不同的分片数"""
+    by_count = {}
+    for label in labels:
+        index, count = parse_shard(label)
+        by_count.setdefault(count, set()).add(index)
+    if len(by_count) > 1:
+        logger.warning(f"分片文件使用了不同的分片数: {', '.join(sorted(labels))}")
+    for count, indices in by_count.items():
+        missing = sorted(set(range(1, count + 1)) - indices)
+        if missing:
+            logger.warning(f"缺少分片: {', '.join(shard_label(index, count) for index in missing)}")
+    if merged:
+        gaps = max(merged) - len(merged)
+        if gaps:
+            logger.warning(f"合并结果中缺少 {gaps} 行（行号不连续），这些行所在的分片文件没有提供")
@@ -1,82 +1,202 @@
-import pandas as pd
 import time
 import random
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from fake_useragent import UserAgent
 import logging
+import threading
+import asyncio
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from result_cache import ResultCache
+from progress_journal import ProgressJournal, replay_journal
+from record_parser import parse_author_sections, clean_corresponding_authors
+from page_store import PageStore, reparse_object
+from driver_manager import DriverManager
+from retry_scheduler import RetryScheduler, parse_retry_budgets
+from wos_api import WosApiClient, api_url, is_transient
+from table_io import iter_table, read_columns, TableWriter, pyarrow_available
+from title_normalizer import normalize_titles, match_key, match_keys, is_missing
+from dedup import group_duplicates, row_key
+from author_registry import AuthorRegistry
+from run_metrics import RunMetrics, serve_prometheus
+from shards import parse_shard, shard_mask, shard_label, shard_path, merge_shard_files, row_column, shard_column
+from scraper_logging import setup_logging, flush_logging, verbosity_levels, row_logger_name
 
-# 设置日志配置
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("scraper_log.txt"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
+# 每行的最终结果作为结构化记录写入JSON日志，见 scraper_logging.py
+row_logger = logging.getLogger(row_logger_name)
 
-# 定义清理标题的函数，移除 and, or, not 关键词以及括号
-def clean_title(title):
-    """从标题中移除 and, or, not 等关键词以及括号及括号内容"""
-    if pd.isna(title):
-        return title
-    
-    # 使用正则表达式处理所有大小写形式的and, or, not
-    import re
-    
-    # 替换所有形式的and, or, not (考虑到单词边界和前后空格)
-    cleaned_title = title
-    # 处理and及其变体
-    cleaned_title = re.sub(r'\s+[Aa][Nn][Dd]\s+', ' ', cleaned_title)
-    cleaned_title = re.sub(r'\s+[Aa][Nn][Dd]\.', '.', cleaned_title)
-    # 处理or及其变体
-    cleaned_title = re.sub(r'\s+[Oo][Rr]\s+', ' ', cleaned_title)
-    cleaned_title = re.sub(r'\s+[Oo][Rr]\.', '.', cleaned_title)
-    # 处理not及其变体
-    cleaned_title = re.sub(r'\s+[Nn][Oo][Tt]\s+', ' ', cleaned_title)
-    cleaned_title = re.sub(r'\s+[Nn][Oo][Tt]\.', '.', cleaned_title)
-    
-    # 移除括号及括号内容 - 处理嵌套括号情况
-    cleaned_title = re.sub(r'\([^()]*\)', '', cleaned_title)
-    # 处理可能留下的空格问题
-    cleaned_title = re.sub(r'\s+', ' ', cleaned_title).strip()
-    
-    if cleaned_title != title:
-        logger.info(f"标题已清理: '{title}' -> '{cleaned_title}'")
-        
-    return cleaned_title
+# selenium 只在启动浏览器时才导入，导入本模块、使用API后端或处理内存中的数据都不需要加载它
+webdriver = By = EC = WebDriverWait = Options = None
+
+class TimeoutException(Exception):
+    """导入selenium之前的占位，import_selenium() 会把它替换为 selenium 的 TimeoutException"""
+
+def import_selenium():
+    global webdriver, By, EC, WebDriverWait, Options, TimeoutException
+    if webdriver is not None:
+        return
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import TimeoutException
+
+# 定义全局令牌桶限速器，所有浏览器共享同一个请求配额
+class TokenBucket:
+    """令牌桶限速器，限制所有工作线程每分钟的总请求数"""
+
+    def __init__(self, rate_per_minute, capacity=1):
+        self.rate = rate_per_minute / 60.0  # 每秒补充的令牌数
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+            waited += wait_time
+
+# 未设置限速时为None，不做任何限制
+rate_limiter = None
+
+# 运行指标：各阶段耗时、处理速度和预计剩余时间，未启用时为None
+metrics = None
 
-# 定义随机延迟函数
-def random_delay(min_seconds=1, max_seconds=3):
-    """随机延迟一段时间，模拟人类行为"""
-    delay = random.uniform(min_seconds, max_seconds)
-    time.sleep(delay)
-    return delay
+def timed(stage, row=None):
+    """用单调时钟计时一个步骤，未启用运行指标时不做任何事"""
+    if metrics is None:
+        return nullcontext()
+    return metrics.span(stage, row)
+
+def acquire_request_slot():
+    """在每次页面请求（提交检索、打开详情页、返回检索页）前获取全局请求配额"""
+    if rate_limiter is not None:
+        with timed('rate_limit_wait'):
+            waited = rate_limiter.acquire()
+        if waited > 0:
+            logger.info(f"达到请求速率上限，等待了{waited:.1f}秒")
 
 # 初始化计数器
 success_count = 0
 fail_count = 0
 
-# 1. 读取 Excel 文件
-file_path = 'paper.xlsx'
-df = pd.read_excel(file_path)
-titles = df['论文题目']  # 使用新的列名获取论文标题
-name_list = df['全部论文作者'].astype(str).tolist()  # 获取全部作者列表
+# 1. 输入文件：paper.xlsx，也支持 paper.csv / paper.tsv / paper.txt (WOS制表符导出) / paper.parquet / paper.arrow
+input_candidates = ['paper.xlsx', 'paper.csv', 'paper.tsv', 'paper.txt', 'paper.parquet', 'paper.arrow']
+# 爬取需要的列，其余列在写出结果时再逐行从输入文件读取
+input_columns = ['全部论文作者', '论文题目', '通讯作者', 'DOI', 'doi', 'DI', 'UT']
+# 可能保存DOI的列，按顺序取第一个存在的列
+doi_columns = ['DOI', 'doi', 'DI']
+
+# 输入数据及由它建立的各列和索引，由 load_input() 设置，导入本模块时不读取任何文件
+file_path = None      # 输入文件，数据直接来自内存时为None
+df = None
+titles = None         # 论文标题
+search_titles = None  # 检索用的清理后标题（移除 and, or, not 等关键词以及括号）
+title_keys = None     # 缓存、进度日志和结果匹配共用的标题键
+search_keys = None    # 清理后标题的标题键
+author_registry = None  # 全部作者名的驻留表，见 author_registry.py
+author_index = None   # 每行作者的ID数组
+doi_column = None     # DOI所在的列（WOS导出通常为DOI或DI），没有则为None
+row_keys = None       # 进度日志和断点续爬使用的行键：有DOI或UT时按DOI/UT，否则为标题键
 
-# 添加一个新列用于保存通讯作者，插在全部论文作者和论文题目之间
-if '通讯作者' not in df.columns:
-    df.insert(2, '通讯作者', '')  # 插入在第三列位置
+# 为属于本行作者的通讯作者加上星号
+def mark_row_authors(row_authors, names):
+    # 只查询不登记：解析阶段在多个线程中调用，本行作者都已在 load_input() 中登记
+    return [name + '*' if author_registry.lookup(name) in row_authors else name for name in names]
 
-# 添加一个新列记录处理状态
-df['处理状态'] = 'pending'
+# 为表格的每一行生成行键（见 dedup.row_key），同名但DOI不同的文章不会共用一条进度记录
+def identity_keys(frame, keys):
+    doi_col = next((col for col in doi_columns if col in frame.columns), None)
+    dois = frame[doi_col] if doi_col else [None] * len(frame)
+    uts = frame['UT'] if 'UT' in frame.columns else [None] * len(frame)
+    return [row_key(key, doi, ut) for key, doi, ut in zip(keys, dois, uts)]
+
+def find_input_file():
+    return next((path for path in input_candidates if os.path.exists(path)), 'paper.xlsx')
+
+# 读取输入数据，建立爬取需要的各列和索引
+def load_input(source=None):
+    """设置 df 及由它建立的标题、标题键和作者索引，返回df
+    
+    参数:
+    source: 输入文件路径；或内存中的表格（DataFrame，或可以转换为DataFrame的字典、记录列表），
+            至少包含 全部论文作者 和 论文题目 两列；为None时在当前目录按 input_candidates 查找输入文件
+    """
+    global file_path, df, titles, search_titles, title_keys, search_keys, author_registry, author_index, doi_column
+    global row_keys
+    
+    if source is None or isinstance(source, (str, os.PathLike)):
+        file_path = source or find_input_file()
+        # 流式读取，只在内存中保留爬取需要的列
+        df = read_columns(file_path, input_columns)
+    else:
+        import pandas as pd
+        file_path = None
+        df = pd.DataFrame(source).reset_index(drop=True).astype(object)
+    titles = df['论文题目']  # 使用新的列名获取论文标题
+    
+    # 整列一次性规范化标题
+    search_titles = normalize_titles(titles)
+    title_keys = match_keys(titles)
+    search_keys = match_keys(search_titles)
+    
+    # 每行作者的ID数组，只构建一次：同一作者在全部行中只规范化、保存一次
+    author_registry = AuthorRegistry()
+    author_index = [author_registry.row_ids(authors) for authors in df['全部论文作者']]
+    
+    # 添加一个新列用于保存通讯作者
+    if '通讯作者' not in df.columns:
+        df['通讯作者'] = ''
+    
+    doi_column = next((col for col in doi_columns if col in df.columns), None)
+    row_keys = identity_keys(df, title_keys)
+    
+    # 添加一个新列记录处理状态
+    df['处理状态'] = 'pending'
+    return df
+
+# 本地结果缓存，未启用时为None
+result_cache = None
+
+# 详情页存档，未启用时为None
+page_store = None
+
+# 只追加的进度日志，每篇文章处理完立即写入；journal_file 为None时不写进度日志
+journal_file = 'paper_with_authors_progress.jsonl'
+journal = None
+
+# 按需从进度日志生成的进度Excel文件，断点续爬时也会读取
+progress_file = 'paper_with_authors_progress.xlsx'
+
+# 多机分片运行时本机处理的分片 (i, N) 及每一行是否属于本分片，由 select_shard() 设置，不分片时为None
+shard = None
+shard_rows = None
+
+def select_shard(index, count):
+    """只处理按标题键哈希分到第index片（共count片）的文章，在 load_input() 之后调用"""
+    global shard, shard_rows
+    shard = (index, count)
+    shard_rows = shard_mask(title_keys, index, count)
+    logger.info(f"分片 {shard_label(index, count)}: 本机处理 {sum(shard_rows)}/{len(shard_rows)} 行")
+
+# 高级检索页面地址，离线测试时可用 --base-url 指向本地模拟网站 mock_wos_site.py
+base_url = 'https://webofscience.clarivate.cn/wos/woscc/advanced-search'
+
+# 是否使用无头模式（--headless）
+headless = False
 
 # 创建代理IP列表（如有需要，可以添加更多代理）
 proxy_list = [
@@ -92,10 +212,12 @@ def get_random_proxy():
 
 # 定义一个函数来初始化浏览器，便于重试时创建新的浏览器实例
 def init_browser():
+    import_selenium()
     options = Options()
     
-    # 使用随机User-Agent
+    # 使用随机User-Agent，未安装 fake_useragent 时使用固定的User-Agent
     try:
+        from fake_useragent import UserAgent
         ua = UserAgent()
         user_agent = ua.random
         options.add_argument(f'user-agent={user_agent}')
@@ -121,7 +243,8 @@ def init_browser():
     options.add_experimental_option('useAutomationExtension', False)
     
     # 可选：使用无头模式，但有时无头模式更容易被检测到
-    # options.add_argument("--headless")
+    if headless:
+        options.add_argument("--headless=new")
     
     # 初始化浏览器
     driver = webdriver.Chrome(options=options)
@@ -132,8 +255,11 @@ def init_browser():
     })
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     
-    # 设置等待
-    wait = WebDriverWait(driver, 10)
+    # 页面加载超过60秒视为卡住，抛出异常而不是一直等待
+    driver.set_page_load_timeout(60)
+    
+    # 设置等待，条件满足后最多0.2秒即可继续
+    wait = WebDriverWait(driver, 10, poll_frequency=0.2)
     
     return driver, wait
 
@@ -150,307 +276,890 @@ def check_for_captcha(driver):
         return False
     return False
 
-# 定义搜索和提取通讯作者的函数
-def process_article(driver, wait, title_idx, title, name_list):
-    """处理单篇文章，每篇只尝试一次"""
-    global success_count, fail_count
+# 显式等待层：按页面实际渲染情况等待，取代每一步之后固定的随机休眠
+# 访问节奏由全局限速器 acquire_request_slot 统一控制
+def wait_for_search_page(wait):
+    """等待高级检索输入框出现"""
+    return wait.until(EC.presence_of_element_located((By.ID, 'advancedSearchInputArea')))
+
+# 检索结果页上"没有找到结果"的提示，只有出现该提示时才判定为检索无结果
+no_results_selector = '.search-error, .no-results'
+
+def wait_for_results(wait):
+    """等待检索结果列表或"没有找到结果"的提示出现，返回是否有结果
+    
+    两者都没有出现时抛出 TimeoutException：结果页加载慢不等于没有结果，按超时处理可以重试
+    """
+    def results_or_empty(driver):
+        if driver.find_elements(By.CSS_SELECTOR, 'a.title.title-link'):
+            return 'results'
+        if driver.find_elements(By.CSS_SELECTOR, no_results_selector):
+            return 'empty'
+        return False
+    return wait.until(results_or_empty) == 'results'
+
+def wait_for_record(wait):
+    """等待文章详情页的作者信息区域渲染完成，返回是否出现"""
+    try:
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.author-info-section.ng-star-inserted')))
+        return True
+    except TimeoutException:
+        return False
+
+def dismiss_cookie_banner(driver, wait):
+    """关闭Cookie弹窗并等待遮罩消失"""
+    cookie_button = driver.find_element(By.ID, "onetrust-accept-btn-handler")
+    if cookie_button.is_displayed():
+        cookie_button.click()
+        wait.until(EC.invisibility_of_element_located((By.ID, "onetrust-accept-btn-handler")))
+
+def return_to_search(driver, wait):
+    """返回高级检索页面，准备下一个搜索"""
+    acquire_request_slot()
+    driver.get(base_url)
+    wait_for_search_page(wait)
+
+# 在高级检索框中输入检索式并提交
+def submit_search(driver, wait, query):
+    """输入检索式并点击检索按钮，返回时结果页已开始加载"""
+    logger.debug("正在搜索标题...")
+    search_box = wait_for_search_page(wait)
+    search_box.clear()
+    search_box.send_keys(query)
+    
+    # 处理可能的Cookie弹窗
+    try:
+        dismiss_cookie_banner(driver, wait)
+    except:
+        pass
+    
+    # 将搜索按钮滚动到视图中，等待可点击后点击
+    search_button = wait.until(EC.presence_of_element_located(
+        (By.CSS_SELECTOR, 'button[data-ta="run-search"]')
+    ))
+    driver.execute_script("arguments[0].scrollIntoView(true);", search_button)
+    search_button = wait.until(EC.element_to_be_clickable(
+        (By.CSS_SELECTOR, 'button[data-ta="run-search"]')
+    ))
+    search_button.click()
+    logger.debug("已点击搜索按钮，等待加载结果...")
+
+# 等待文章详情页加载后取回整页HTML，解析交给解析阶段，浏览器线程只负责取页面
+def fetch_record(driver, wait, title_idx):
+    """只调用一次 page_source 取回整页HTML，不再逐个元素查询浏览器
     
-    base_url = 'https://webofscience.clarivate.cn/wos/woscc/advanced-search'
+    返回 (页面数据, None)，页面数据中的 loaded 表示作者信息区域是否出现，
+    解析阶段据此区分页面未加载（超时）和页面中没有作者信息（解析失败）
+    """
+    with timed('record_load', title_idx):
+        loaded = wait_for_record(wait)
+    if not loaded:
+        logger.warning(f"第 {title_idx+1} 篇文章详情页未出现作者信息区域")
+    logger.debug("开始查找通讯作者...")
+    with timed('page_source', title_idx):
+        html = driver.page_source
+    return {'html': html, 'loaded': loaded}, None
+
+# 定义搜索并取回文章详情页的函数
+def process_article(driver, wait, title_idx, title):
+    """处理单篇文章，每篇只尝试一次
     
+    返回 (页面数据, 失败类别)，失败时页面数据为None，类别见 retry_scheduler.default_retry_budgets
+    """
     try:
-        logger.info(f"正在处理第 {title_idx + 1} 篇文章: '{title}'")
+        logger.info(f"正在处理第 {title_idx + 1} 篇文章: '{title}'", extra={'row': title_idx + 1})
         
         # 检查是否有验证码
-        if check_for_captcha(driver):
+        with timed('captcha_check', title_idx):
+            captcha = check_for_captcha(driver)
+        if captcha:
             logger.warning("检测到验证码，尝试处理后仍无法继续")
-            fail_count += 1
-            return False, ""
-            
-        # 3. 搜索文章标题
-        logger.info("正在搜索标题...")
-        search_box = wait.until(EC.presence_of_element_located((By.ID, 'advancedSearchInputArea')))
-        search_box.clear()
-        
-        # 模拟人类输入行为
-        title_to_search = 'TI=' + title
-        for char in title_to_search:
-            search_box.send_keys(char)
-            time.sleep(random.uniform(0.01, 0.1))  # 随机延迟模拟真人打字速度
+            return None, 'error'
             
-        random_delay()
-        
-        # 处理可能的Cookie弹窗
-        try:
-            cookie_button = driver.find_element(By.ID, "onetrust-accept-btn-handler")
-            if cookie_button.is_displayed():
-                cookie_button.click()
-                random_delay()
-        except:
-            pass
-        
-        # 将搜索按钮滚动到视图中
-        search_button = wait.until(EC.presence_of_element_located(
-            (By.CSS_SELECTOR, 'button[data-ta="run-search"]')
-        ))
-        driver.execute_script("arguments[0].scrollIntoView(true);", search_button)
-        random_delay()
-        
-        # 尝试点击
-        search_button = wait.until(EC.element_to_be_clickable(
-            (By.CSS_SELECTOR, 'button[data-ta="run-search"]')
-        ))
-        search_button.click()
-        logger.info("已点击搜索按钮，等待加载结果...")
-        random_delay(3, 5)
-        
-        # 等待搜索结果页面加载完成
-        try:
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'a.title.title-link')))
-            logger.info("搜索结果已加载，准备点击第一篇文章...")
-        except:
-            logger.warning("未找到搜索结果，可能没有匹配的文章")
-            fail_count += 1
-            return False, ""
+        # 3. 搜索文章标题，等待搜索结果页面加载完成
+        with timed('search', title_idx):
+            submit_search(driver, wait, 'TI=' + title)
+            found = wait_for_results(wait)
+        if found:
+            logger.debug("搜索结果已加载，准备点击第一篇文章...")
+        else:
+            logger.warning("检索结果页显示没有找到结果，可能没有匹配的文章")
+            return None, 'no_hit'
             
         # 打开第一篇结果
-        try:
-            first_result = wait.until(EC.element_to_be_clickable(
-                (By.CSS_SELECTOR, 'a[data-ta="summary-record-title-link"]')
-            ))
-            first_result.click()
-            logger.info("已点击第一篇文章，等待加载详情...")
-            random_delay(3, 5)
-        except:
-            logger.warning("无法点击结果，尝试使用JavaScript点击")
+        acquire_request_slot()
+        with timed('open_record', title_idx):
             try:
-                first_result = driver.find_element(By.CSS_SELECTOR, 'a[data-ta="summary-record-title-link"]')
-                driver.execute_script("arguments[0].click();", first_result)
-                random_delay(3, 5)
+                first_result = wait.until(EC.element_to_be_clickable(
+                    (By.CSS_SELECTOR, 'a[data-ta="summary-record-title-link"]')
+                ))
+                first_result.click()
+                logger.debug("已点击第一篇文章，等待加载详情...")
             except:
-                fail_count += 1
-                return False, ""
-        
-        # 4. 找到作者地址并提取通讯作者名字
-        logger.info("开始查找通讯作者...")
-        corr_authors = []
+                logger.warning("无法点击结果，尝试使用JavaScript点击")
+                try:
+                    first_result = driver.find_element(By.CSS_SELECTOR, 'a[data-ta="summary-record-title-link"]')
+                    driver.execute_script("arguments[0].click();", first_result)
+                except:
+                    return None, 'error'
         
-        try:
-            # 首先找到author-info-section区域
-            author_sections = driver.find_elements(By.CSS_SELECTOR, '.author-info-section.ng-star-inserted')
-            logger.info(f"找到{len(author_sections)}个作者信息区域")
-            
-            for section in author_sections:
-                # 查找所有通讯作者组
-                addr_titles = section.find_elements(By.CSS_SELECTOR, '[id^="FRAiinTa-RepAddrTitle-"]')
-                logger.info(f"找到{len(addr_titles)}组通讯作者信息")
-                
-                for addr_title in addr_titles:
-                    # 对每组通讯作者，查找所有作者名
-                    author_names = section.find_elements(By.CSS_SELECTOR, 'span.value.section-label-data')
-                    for author_name in author_names:
-                        name = author_name.text.strip()
-                        if name:
-                            if name in name_list:
-                                name += '*'
-                            corr_authors.append(name)
-                            logger.info(f"找到通讯作者: {name}")
-        except Exception as e:
-            logger.error(f"查找通讯作者时出错: {e}")
-            fail_count += 1
-            return False, ""
+        # 4. 取回详情页，通讯作者在解析阶段提取
+        return fetch_record(driver, wait, title_idx)
             
-        # 清洗通讯作者信息，使用分号和(corresponding author)作为分隔符
-        cleaned_authors = []
-        logger.info("开始清洗通讯作者信息...")
-        
-        # 将所有作者信息连接成一个字符串
-        all_authors_text = '; '.join(corr_authors)
-        logger.info(f"连接后的原始作者信息: {all_authors_text}")
-        
-        # 按照(corresponding author)拆分
-        author_segments = all_authors_text.split('(corresponding author)')
-        
-        for segment in author_segments:
-            # 按分号拆分
-            names = segment.split(';')
-            for name in names:
-                name = name.strip()
-                # 检查是否像一个人名 (通常是 "姓, 名" 格式)
-                if ',' in name and len(name.split(',')) == 2:
-                    last_name = name.split(',')[0].strip()
-                    first_name = name.split(',')[1].strip()
-                    # 确保姓和名都不为空且不含有明显的非人名信息
-                    if (last_name and first_name and 
-                        not any(x in name.lower() for x in ['univ', 'school', 'institute', 'dept'])):
-                        cleaned_authors.append(name)
-                        logger.info(f"提取到有效作者: {name}")
+    except TimeoutException as e:
+        logger.error(f"处理第{title_idx + 1}篇文章时超时: {e}", extra={'row': title_idx + 1})
+        return None, 'timeout'
+    except Exception as e:
+        logger.error(f"处理第{title_idx + 1}篇文章时出错: {e}", extra={'row': title_idx + 1})
+        return None, 'error'
+
+# 原始标题和清理后的标题都可以用来匹配检索结果，返回 {标题键: [序号]}
+def title_keys_for(indices):
+    key_to_indices = {}
+    for idx in indices:
+        for key in {title_keys[idx], search_keys[idx]}:
+            if key:
+                key_to_indices.setdefault(key, []).append(idx)
+    return key_to_indices
+
+# 批量检索：一次高级检索覆盖多篇文章，再把结果逐条匹配回原始行
+def process_batch(driver, wait, indices):
+    """用 TI=(...) OR TI=(...) 一次检索多篇文章，只打开匹配上的记录
+    
+    返回 [(序号, 页面数据, 失败类别)]，未匹配到的文章记为 batch_miss，留给逐篇重试
+    """
+    results = {idx: (None, 'batch_miss') for idx in indices}
+    key_to_indices = title_keys_for(indices)
+    
+    try:
+        logger.info(f"正在批量检索 {len(indices)} 篇文章: 第 {', '.join(str(i + 1) for i in indices)} 篇")
         
-        # 去重
-        cleaned_authors = list(dict.fromkeys(cleaned_authors))
+        with timed('captcha_check'):
+            captcha = check_for_captcha(driver)
+        if captcha:
+            logger.warning("检测到验证码，尝试处理后仍无法继续")
+            return [(idx,) + results[idx] for idx in indices]
         
-        if cleaned_authors:
-            logger.info(f"文章 {title_idx+1}: '{title}' 的通讯作者为: {', '.join(cleaned_authors)}")
-            success_count += 1
-            return True, '; '.join(cleaned_authors)
-        else:
-            logger.warning(f"未能提取到有效的通讯作者信息")
-            fail_count += 1
-            return False, ""
+        acquire_request_slot()
+        query = ' OR '.join(f'TI=({search_titles[idx]})' for idx in indices)
+        with timed('batch_search'):
+            submit_search(driver, wait, query)
+            
+            # 读取整页检索结果，记录每条结果的标题和详情页链接
+            try:
+                found = wait_for_results(wait)
+            except TimeoutException:
+                logger.warning("批量检索的结果页加载超时")
+                return [(idx, None, 'timeout') for idx in indices]
+            if not found:
+                logger.warning("批量检索没有返回结果")
+                return [(idx,) + results[idx] for idx in indices]
             
+            record_links = {}
+            for link in driver.find_elements(By.CSS_SELECTOR, 'a[data-ta="summary-record-title-link"]'):
+                matched = key_to_indices.get(match_key(link.text), [])
+                href = link.get_attribute('href')
+                for idx in matched:
+                    # 同一篇文章可能有多条结果，只保留第一条
+                    if href and idx not in record_links:
+                        record_links[idx] = href
+        logger.info(f"批量检索匹配到 {len(record_links)}/{len(indices)} 篇文章")
     except Exception as e:
-        logger.error(f"处理第{title_idx + 1}篇文章时出错: {e}")
-        fail_count += 1
-        return False, ""
+        logger.error(f"批量检索时出错: {e}")
+        return [(idx,) + results[idx] for idx in indices]
+    
+    # 只打开匹配上的记录
+    for idx in indices:
+        if idx not in record_links:
+            logger.warning(f"第 {idx+1} 篇文章未在批量检索结果中找到")
+            continue
+        try:
+            acquire_request_slot()
+            with timed('open_record', idx):
+                driver.get(record_links[idx])
+            results[idx] = fetch_record(driver, wait, idx)
+        except Exception as e:
+            logger.error(f"处理第{idx + 1}篇文章时出错: {e}")
+            results[idx] = (None, 'timeout' if isinstance(e, TimeoutException) else 'error')
+    
+    return [(idx,) + results[idx] for idx in indices]
+
+# 处理一个任务：单篇文章走逐篇检索，多篇文章走批量检索
+def process_task(driver, wait, task):
+    """返回 [(序号, 页面数据, 失败类别)]"""
+    if len(task) > 1:
+        return process_batch(driver, wait, task)
+    
+    idx = task[0]
+    acquire_request_slot()
+    return [(idx,) + process_article(driver, wait, idx, search_titles[idx])]
 
-# 主处理函数，包含两轮尝试
-def main_scraping_process(mode='skip_marked'):
+# API后端处理一个任务：一次请求检索任务中的全部文章，按标题匹配回原始行
+async def fetch_api_task(client, task):
+    """返回值与 process_task 相同: [(序号, 页面数据, 失败类别)]，页面数据为 {'names': 通讯作者姓名列表}
+    
+    API返回的通讯作者与详情页解析结果在解析阶段经过同样的清洗和标记
     """
-    爬取数据的主函数
+    no_match = 'no_hit' if len(task) == 1 else 'batch_miss'
+    key_to_indices = title_keys_for(task)
+    logger.info(f"正在通过API检索 {len(task)} 篇文章: 第 {', '.join(str(i + 1) for i in task)} 篇")
     
-    参数:
-    mode: 可选值 'complete' 或 'skip_marked'
-          'complete' - 重新检索并标记所有文章
-          'skip_marked' - 跳过已有通讯作者的文章
+    try:
+        # 每一页请求前由客户端在请求线程中获取配额（见 new_sessions），限速器休眠不会阻塞事件循环
+        with timed('api_search'):
+            records = await client.search_titles([search_titles[idx] for idx in task])
+    except Exception as e:
+        logger.error(f"API检索出错: {e}")
+        return [(idx, None, 'timeout' if is_transient(e) else 'error') for idx in task]
+    
+    matched = {}
+    for record_title, names in records:
+        for idx in key_to_indices.get(match_key(record_title), []):
+            # 同一篇文章可能有多条结果，只保留第一条
+            matched.setdefault(idx, names)
+    
+    results = []
+    for idx in task:
+        if idx in matched:
+            results.append((idx, {'names': matched[idx]}, None))
+        else:
+            logger.warning(f"第 {idx+1} 篇文章未在API检索结果中找到")
+            results.append((idx, None, no_match))
+    return results
+
+# 解析阶段：从取回的页面数据中提取通讯作者，清洗后标记出现在本行作者列表中的名字
+def parse_fetched(idx, raw, failure):
+    """返回 (序号, 是否成功, 通讯作者字符串, 失败类别)
+    
+    详情页HTML在本地解析，API返回的姓名直接清洗，两种后端得到相同结构的结果
     """
     global success_count, fail_count
     
-    # 记录开始时间，用于计算总用时
-    start_time = datetime.now()
+    if raw is None:
+        fail_count += 1
+        return idx, False, "", failure
     
-    # 首先安装fake_useragent（如果尚未安装）
     try:
-        import fake_useragent
-    except ImportError:
-        logger.info("正在安装fake_useragent...")
-        import subprocess
-        subprocess.call(['pip', 'install', 'fake-useragent'])
-    
-    logger.info(f"开始爬取数据... 模式: {mode}")
-    logger.info(f"共有{len(titles)}篇文章需要处理")
-    
-    # 使用一个固定的输出文件名，而不是每次都创建新文件
-    output_file = 'paper_with_authors_progress.xlsx'
-    update_interval = 5  # 每处理5篇文章更新一次文件
+        if 'html' in raw:
+            if page_store is not None:
+                with timed('archive', idx):
+                    page_store.save(raw['html'], row_keys[idx], idx)
+            with timed('parse', idx):
+                raw_names = parse_author_sections(raw['html'])
+        else:
+            raw_names = raw['names']
+    except Exception as e:
+        logger.error(f"查找通讯作者时出错: {e}", extra={'row': idx + 1})
+        fail_count += 1
+        return idx, False, "", 'parse_error'
+    # 原始作者信息只在 verbose 下记录，其他级别不拼接字符串
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"连接后的原始作者信息: {'; '.join(raw_names)}")
     
-    # 用于记录失败的文章序号
-    failed_article_indexes = []
+    # 清洗后去重，并标记出现在本行作者列表中的通讯作者
+    cleaned_authors = mark_row_authors(author_index[idx], clean_corresponding_authors(raw_names))
     
-    # 初始化浏览器
-    driver, wait = init_browser()
+    if cleaned_authors:
+        logger.info(f"文章 {idx+1}: '{titles[idx]}' 的通讯作者为: {', '.join(cleaned_authors)}", extra={'row': idx + 1})
+        success_count += 1
+        return idx, True, '; '.join(cleaned_authors), None
     
-    base_url = 'https://webofscience.clarivate.cn/wos/woscc/advanced-search'
-    driver.get(base_url)
-    random_delay(2, 4)
+    logger.warning(f"第 {idx+1} 篇文章未能提取到有效的通讯作者信息", extra={'row': idx + 1})
+    fail_count += 1
+    return idx, False, "", 'parse_error' if raw.get('loaded', True) else 'timeout'
+
+# 打开高级检索页面，并处理可能出现的Cookie弹窗
+def open_search_page(driver, wait):
+    return_to_search(driver, wait)
     
-    # 处理初始Cookie弹窗
     try:
-        accept_button = WebDriverWait(driver, 5).until(
+        WebDriverWait(driver, 5, poll_frequency=0.2).until(
             EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
         )
-        logger.info("检测到 Cookie 弹窗，尝试关闭...")
-        accept_button.click()
-        random_delay()
+        logger.debug("检测到 Cookie 弹窗，尝试关闭...")
+        dismiss_cookie_banner(driver, wait)
     except:
-        logger.info("未检测到 Cookie 弹窗，继续执行...")
-    
-    # 第一轮：处理所有文章
-    processed_count = 0
-    for idx, title in enumerate(titles):
-        # 检查是否跳过已标记文章
-        if mode == 'skip_marked' and (
-            # 检查作者字段中是否包含*号，表示已经标记过通讯作者
-            ('*' in str(df.at[idx, '全部论文作者'])) or 
-            # 同时也保留原来的检查，确保兼容性
-            (not pd.isna(df.at[idx, '通讯作者']) and df.at[idx, '通讯作者'].strip() != '')
-        ):
-            logger.info(f"跳过第 {idx+1} 篇文章，已有通讯作者标记")
-            df.at[idx, '处理状态'] = '已标记'  # 修改处理状态为"已标记"
-            processed_count += 1
-            # 计入已处理文章，并保存进度
-            if processed_count % update_interval == 0:
-                df.to_excel(output_file, index=False)
-            continue
-            
-        if pd.isna(title):
-            logger.info(f"跳过第 {idx+1} 篇文章，标题为空")
-            df.at[idx, '处理状态'] = 'skip'
-            continue
-        
-        # 清理标题，移除 and, or, not 等关键词以及括号
-        cleaned_title = clean_title(title)
-        
-        success, corr_authors = process_article(driver, wait, idx, cleaned_title, name_list)
-        
+        logger.debug("未检测到 Cookie 弹窗，继续执行...")
+
+# 生成一篇文章在结果缓存中的键：规范化标题，以及导出文件中有DOI时的DOI
+def cache_keys(idx):
+    keys = []
+    if search_keys[idx]:
+        keys.append('title:' + search_keys[idx])
+    if doi_column is not None and not is_missing(df.at[idx, doi_column]):
+        doi = str(df.at[idx, doi_column]).strip().lower()
+        if doi:
+            keys.insert(0, 'doi:' + doi)
+    return keys
+
+# 查找缓存时使用的键：有DOI的行只按DOI查找，同名但DOI不同的文章（如 Editorial）不会共用结果；
+# 没有DOI的行按标题查找
+def cache_lookup_keys(idx):
+    return cache_keys(idx)[:1]
+
+# 将单篇文章的处理结果写回df并追加到进度日志，只在流水线的写入阶段调用
+# 每行的处理结果写入JSON日志: {"event": "row_result", "row": 行号, "status", "authors", "failure", "from_cache"}
+def log_row_result(idx, status, authors='', failure=None, from_cache=False):
+    row_logger.info(f"第 {idx+1} 篇文章: {status}", extra={
+        'event': 'row_result', 'row': idx + 1, 'status': status,
+        'authors': authors, 'failure': failure, 'from_cache': from_cache,
+    })
+
+def record_result(idx, success, corr_authors, fail_status, from_cache=False, failure=None, attempts=None):
+    with timed('save', idx):
         if success:
             df.at[idx, '通讯作者'] = corr_authors
             df.at[idx, '处理状态'] = 'success'
+            if result_cache is not None and not from_cache:
+                # 星号取决于所在行的作者列表，缓存中只保存未标记的名字
+                result_cache.put(cache_keys(idx), corr_authors.replace('*', ''))
         else:
-            df.at[idx, '处理状态'] = 'failed_round1'
-            # 记录第一轮失败的文章序号
-            failed_article_indexes.append(idx + 1)
-        
-        processed_count += 1
-        
-        # 定期保存进度（每处理update_interval篇文章或处理到最后一篇时）
-        if processed_count % update_interval == 0 or idx == len(titles) - 1:
-            df.to_excel(output_file, index=False)
-        
-        # 返回主页准备下一个搜索
-        driver.get(base_url)
-        random_delay(2, 5)
+            df.at[idx, '处理状态'] = fail_status
+        if journal is not None:
+            journal.append(idx, row_keys[idx], df.at[idx, '处理状态'], corr_authors if success else '',
+                           failure, attempts)
+        log_row_result(idx, df.at[idx, '处理状态'], corr_authors if success else '', failure, from_cache)
     
-    # 重启浏览器，避免长时间运行导致的问题
-    driver.quit()
-    random_delay(5, 10)
-    driver, wait = init_browser()
-    driver.get(base_url)
-    random_delay(2, 4)
+    # 有了最终结果的行计入处理速度，定期输出进度和预计剩余时间
+    if metrics is not None and df.at[idx, '处理状态'] != 'retrying' and metrics.finish_row():
+        logger.info(metrics.progress_line())
+
+# 断点续爬时会恢复的处理状态：成功、失败后等待重试、重试次数用完仍失败
+# failed_round1 是旧版本两轮处理时第一轮失败的状态，按等待重试处理
+resumable_statuses = ['success', 'retrying', 'failed_round1', 'failed']
+
+# 读取上次运行的状态，返回 {行键: {'status': 处理状态, 'authors': 通讯作者}}
+def load_resume_state(progress_path=None, path=None):
+    """先读取进度Excel文件，再用更新的进度日志覆盖，两者都按行键（DOI、UT或标题键）合并
     
-    # 处理Cookie弹窗
-    try:
-        accept_button = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-        )
-        accept_button.click()
-        random_delay()
-    except:
-        pass
+    默认读取 progress_file 和 journal_file
+    """
+    state = {}
+    progress_path = progress_path or progress_file
+    path = path or journal_file
     
-    # 第二轮：重试第一轮失败的文章
-    failed_indices = df[df['处理状态'] == 'failed_round1'].index.tolist()
+    if os.path.exists(progress_path):
+        progress_df = read_columns(progress_path, ['论文题目', '处理状态', '通讯作者', *doi_columns, 'UT'])
+        if '论文题目' in progress_df.columns and '处理状态' in progress_df.columns:
+            progress_keys = identity_keys(progress_df, match_keys(progress_df['论文题目']))
+            for key, (_, row) in zip(progress_keys, progress_df.iterrows()):
+                if key and row['处理状态'] in resumable_statuses:
+                    authors = row.get('通讯作者', '')
+                    state[key] = {'status': row['处理状态'], 'authors': '' if is_missing(authors) else str(authors),
+                                  'attempts': {}}
     
-    # 清空失败文章索引列表，以便记录第二轮仍然失败的文章
-    failed_article_indexes = []
+    for record in (replay_journal(path).values() if path else []):
+        if record['key'] and record['status'] in resumable_statuses:
+            state[record['key']] = {'status': record['status'], 'authors': record['authors'],
+                                    'attempts': record.get('attempts') or {}}
     
-    processed_count = 0
-    for idx in failed_indices:
-        title = titles[idx]
-        
-        # 清理标题，移除 and, or, not 等关键词以及括号
-        cleaned_title = clean_title(title)
-        
-        success, corr_authors = process_article(driver, wait, idx, cleaned_title, name_list)
-        
-        if success:
-            df.at[idx, '通讯作者'] = corr_authors
+    return state
+
+# 将上次运行的状态按行键合并到df，返回 {行号: 恢复的记录}，记录中有处理状态、通讯作者和各失败类别的次数
+def apply_resume_state(state):
+    restored = {}
+    for idx, key in enumerate(row_keys):
+        record = state.get(key)
+        if record is None:
+            continue
+        df.at[idx, '处理状态'] = record['status']
+        if record['status'] == 'success':
+            # 星号取决于所在行的作者列表，按本行作者重新标记
+            names = record['authors'].replace('*', '').split('; ')
+            df.at[idx, '通讯作者'] = '; '.join(mark_row_authors(author_index[idx], names))
+        restored[idx] = record
+    return restored
+
+# 逐行读取输入文件并合并当前结果，流式写出，内存占用不随文件大小增长
+def write_output(output_file):
+    if file_path is None:
+        # 数据直接来自内存，df中已有全部列
+        header, rows = list(df.columns), df.itertuples(index=False, name=None)
+    else:
+        header, rows = iter_table(file_path)
+    # 通讯作者插在全部论文作者和论文题目之后（第三列），处理状态放在最后
+    out_header = list(header)
+    if '通讯作者' not in out_header:
+        out_header.insert(2, '通讯作者')
+    if '处理状态' not in out_header:
+        out_header.append('处理状态')
+    positions = [header.index(column) if column in header else None for column in out_header]
+    corr_pos = out_header.index('通讯作者')
+    status_pos = out_header.index('处理状态')
+    if shard is not None:
+        # 分片结果只包含本分片的行，另加行号和分片两列，供合并时恢复原始行顺序
+        out_header += [row_column, shard_column]
+        label = shard_label(*shard)
+    
+    with timed('write_output'), TableWriter(output_file, out_header) as writer:
+        for idx, values in enumerate(rows):
+            if shard_rows is not None and not shard_rows[idx]:
+                continue
+            out_values = [values[pos] if pos is not None else None for pos in positions]
+            out_values[corr_pos] = df.at[idx, '通讯作者']
+            out_values[status_pos] = df.at[idx, '处理状态']
+            if shard is not None:
+                out_values += [idx + 1, label]
+            writer.write_row(out_values)
+
+# 按需从进度日志生成进度Excel文件
+def export_progress(output_file=None):
+    output_file = output_file or progress_file
+    restored = apply_resume_state(load_resume_state(output_file))
+    write_output(output_file)
+    logger.info(f"已从进度日志恢复{len(restored)}篇文章的结果，并写入{output_file}")
+
+# 从详情页存档重新提取所有文章的通讯作者，不需要浏览器
+def reextract_from_store(store, processes=None):
+    """用当前的解析和清洗规则并行重新解析存档页面，重建每一行的通讯作者
+    
+    没有存档页面的文章保留进度文件和进度日志中的原有结果
+    """
+    apply_resume_state(load_resume_state())
+    
+    index = store.load_index()
+    digests = sorted(set(index.values()))
+    logger.info(f"存档中共有 {len(index)} 篇文章、{len(digests)} 个不同的页面，开始重新解析...")
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        parsed = dict(pool.map(reparse_object, [(store.root, digest) for digest in digests], chunksize=64))
+    
+    updated = 0
+    for idx, key in enumerate(row_keys):
+        digest = index.get(key)
+        if digest is None:
+            continue
+        names = mark_row_authors(author_index[idx], parsed[digest])
+        if names:
+            df.at[idx, '通讯作者'] = '; '.join(names)
             df.at[idx, '处理状态'] = 'success'
         else:
+            df.at[idx, '通讯作者'] = ''
             df.at[idx, '处理状态'] = 'failed'
-            # 记录最终失败的文章序号
-            failed_article_indexes.append(idx + 1)  # +1 转换为从1开始的序号
+        updated += 1
+    logger.info(f"已根据存档页面重建 {updated} 篇文章的通讯作者")
+    return updated
+
+# 启动一个浏览器并打开高级检索页面，供浏览器管理器创建新实例和备用实例
+def start_browser():
+    driver, wait = init_browser()
+    open_search_page(driver, wait)
+    return driver, wait
+
+# 浏览器回收设置，可通过命令行参数修改
+driver_settings = {
+    'max_pages': 300,     # 每个浏览器处理多少个页面后回收
+    'max_rss_mb': None,   # 浏览器进程树内存上限(MB)，需要psutil
+    'warm_spare': True,   # 回收前在后台提前启动备用浏览器
+}
+
+def new_driver_manager(worker_id):
+    return DriverManager(start_browser, name=f"浏览器{worker_id}", **driver_settings)
+
+# 抓取后端：每个取页面工作者使用一个会话，会话提供 start() / fetch(task) / close()，
+# fetch 返回 [(序号, 页面数据, 失败类别)]，可以是普通函数（在线程中运行）或协程
+class SeleniumSession:
+    """浏览器后端：在自己的浏览器中检索并取回详情页，阻塞调用在线程池中运行"""
+    
+    def __init__(self, worker_id):
+        self.manager = new_driver_manager(worker_id)
+        self.name = self.manager.name
+    
+    def start(self):
+        self.manager.acquire()
+    
+    def fetch(self, task):
+        return run_task_with_manager(self.manager, task)
+    
+    def close(self):
+        self.manager.close()
+
+class ApiSession:
+    """API后端：所有会话共用一个客户端（连接池），不需要浏览器"""
+    
+    def __init__(self, worker_id, client):
+        self.client = client
+        self.name = f"API会话{worker_id}"
+    
+    def start(self):
+        pass
+    
+    async def fetch(self, task):
+        return await fetch_api_task(self.client, task)
+    
+    def close(self):
+        pass
+
+# 抓取后端设置，可通过命令行参数修改
+backend_settings = {
+    'backend': 'selenium',  # selenium 或 api
+    'api_key': None,
+    'api_url': api_url,
+}
+
+def new_sessions(workers):
+    """按后端设置创建会话，返回 (会话列表, 全部会话关闭后的清理函数)"""
+    if backend_settings['backend'] == 'api':
+        # 每一页结果都计为一次请求，占用全局请求配额
+        client = WosApiClient(backend_settings['api_key'], backend_settings['api_url'], max_connections=workers,
+                              before_request=acquire_request_slot)
+        return [ApiSession(worker_id, client) for worker_id in range(1, workers + 1)], client.close
+    return [SeleniumSession(worker_id) for worker_id in range(1, workers + 1)], lambda: None
+
+# 用浏览器管理器处理一个任务，处理完返回检索页并记录页面数，浏览器异常时自动重启
+def run_task_with_manager(manager, task):
+    with timed('browser_acquire'):
+        driver, wait = manager.acquire()
+    results = process_task(driver, wait, task)
+    
+    # 返回主页准备下一个搜索
+    try:
+        with timed('return_to_search'):
+            return_to_search(driver, wait)
+    except Exception as e:
+        logger.error(f"{manager.name}返回检索页失败: {e}")
+        manager.mark_unhealthy()
+        return results
+    
+    # 一次检索加上打开的详情页
+    manager.page_done(len(task) + 1)
+    return results
+
+# ---- 异步处理流水线 ----
+# 读取 → 筛选 → 缓存查询 → 取页面（多个工作者） → 解析 → 写入结果
+# 标题在读取输入文件时已整列规范化（search_titles / title_keys）
+# 各阶段之间用有界队列连接，下游处理不过来时上游自动等待；
+# 阻塞操作（浏览器、SQLite、进度日志落盘、HTML解析）在线程池中运行，彼此可以重叠
+
+# 阶段1：按顺序读出待处理的行
+async def read_rows(row_queue):
+    for idx in range(len(titles)):
+        # 分片运行时只处理本分片的行
+        if shard_rows is None or shard_rows[idx]:
+            await row_queue.put(idx)
+    await row_queue.put(None)
+
+# 重复文章的分组状态：每组第一篇需要检索的行作为代表，其余行等待代表的最终结果
+class DuplicateGroups:
+    def __init__(self, groups):
+        self.groups = groups     # 每一行所属的文章组，见 dedup.group_duplicates
+        self.leaders = {}        # {文章组: 代表行}
+        self.followers = {}      # {代表行: [等待结果的重复行]}
+        self.finished = {}       # {代表行: (是否成功, 通讯作者, 失败类别)}
+        self.saved = 0
+    
+    def join(self, idx):
+        """登记一行需要检索的文章，返回它的代表行；返回自身时需要检索"""
+        leader = self.leaders.setdefault(self.groups[idx], idx)
+        if leader != idx:
+            self.followers.setdefault(leader, []).append(idx)
+            self.saved += 1
+            logger.info(f"第 {idx+1} 篇文章与第 {leader+1} 篇是同一篇文章，直接使用其结果")
+        return leader
+
+# 把代表行的最终结果分发给一个重复行，通讯作者按该行自己的作者列表重新标记
+def fan_out_result(idx, success, corr_authors, failure):
+    if success:
+        names = corr_authors.replace('*', '').split('; ')
+        record_result(idx, True, '; '.join(mark_row_authors(author_index[idx], names)), 'failed', True)
+    else:
+        record_result(idx, False, "", 'failed', False, failure)
+
+# 一行在本次运行中的处理方式:
+#   retry  上次等待重试（或 --retry-failed 时上次最终失败）的文章，直接作为重试任务
+#   keep   上次已成功或已失败的文章，保持原状态
+#   marked 跳过已标记通讯作者的文章（skip_marked 模式）
+#   empty  跳过标题为空的文章
+#   search 需要检索
+def row_action(idx, mode, restored, retry_failed):
+    record = restored.get(idx)
+    status = record['status'] if record else None
+    if status in ('retrying', 'failed_round1') or (status == 'failed' and retry_failed):
+        return 'retry'
+    if status is not None:
+        return 'keep'
+    
+    # 检查是否跳过已标记文章
+    if mode == 'skip_marked' and (
+        # 检查作者字段中是否包含*号，表示已经标记过通讯作者
+        ('*' in str(df.at[idx, '全部论文作者'])) or 
+        # 同时也保留原来的检查，确保兼容性
+        (not is_missing(df.at[idx, '通讯作者']) and df.at[idx, '通讯作者'].strip() != '')
+    ):
+        return 'marked'
+    if is_missing(titles[idx]):
+        return 'empty'
+    return 'search'
+
+# 不需要检索的行只修改处理状态：跳过的行写入结构化日志，等待重试的行之后还会有结果
+def record_status(idx, status):
+    df.at[idx, '处理状态'] = status
+    if status != 'retrying':
+        log_row_result(idx, status)
+
+# 阶段2：按模式和续爬状态决定每一行是否需要检索，同一篇文章只检索一次
+# 处理状态的修改也交给写入阶段，df只由写入阶段修改
+async def filter_rows(row_queue, lookup_queue, write_queue, scheduler, duplicates, mode, restored, retry_failed):
+    while True:
+        idx = await row_queue.get()
+        if idx is None:
+            break
+        action = row_action(idx, mode, restored, retry_failed)
+        if action == 'retry':
+            # 上次等待重试的文章直接作为重试任务，已用掉的重试次数继续累计
+            await write_queue.put(('status', idx, 'retrying'))
+            if await join_duplicates(idx, duplicates, write_queue) == idx:
+                scheduler.add_retry(idx, attempts=restored[idx]['attempts'])
+        elif action == 'marked':
+            logger.info(f"跳过第 {idx+1} 篇文章，已有通讯作者标记")
+            await write_queue.put(('status', idx, '已标记'))  # 修改处理状态为"已标记"
+        elif action == 'empty':
+            logger.info(f"跳过第 {idx+1} 篇文章，标题为空")
+            await write_queue.put(('status', idx, 'skip'))
+        elif action == 'search':
+            if await join_duplicates(idx, duplicates, write_queue) == idx:
+                await lookup_queue.put(idx)
+    
+    if duplicates.saved:
+        duplicate_groups = sum(1 for followers in duplicates.followers.values() if followers)
+        logger.info(f"去重: {duplicates.saved} 行与其他行是同一篇文章（{duplicate_groups} 组），节省 {duplicates.saved} 次检索")
+    await lookup_queue.put(None)
+
+# 登记一行，代表行已有最终结果时立即分发
+async def join_duplicates(idx, duplicates, write_queue):
+    leader = duplicates.join(idx)
+    if leader != idx and leader in duplicates.finished:
+        duplicates.followers[leader].remove(idx)
+        await write_queue.put(('fanout', idx) + duplicates.finished[leader])
+    return leader
+
+# 阶段3：先查本地缓存，命中则直接写入结果，未命中的按批量大小分组交给取页面工作者
+async def lookup_cache(lookup_queue, write_queue, scheduler, batch_size, io_executor):
+    loop = asyncio.get_running_loop()
+    batch = []
+    pending_count = 0
+    while True:
+        idx = await lookup_queue.get()
+        if idx is None:
+            break
+        if result_cache is not None:
+            with timed('cache_lookup', idx):
+                cached_authors = await loop.run_in_executor(io_executor, result_cache.get, cache_lookup_keys(idx))
+            if cached_authors is not None:
+                cached_authors = '; '.join(mark_row_authors(author_index[idx], cached_authors.split('; ')))
+                logger.info(f"第 {idx+1} 篇文章命中本地缓存: {cached_authors}")
+                await write_queue.put(('cache', idx, True, cached_authors, None))
+                continue
         
-        processed_count += 1
+        pending_count += 1
+        batch.append(idx)
+        if len(batch) >= batch_size:
+            await scheduler.put(batch)
+            batch = []
+    if batch:
+        await scheduler.put(batch)
+    scheduler.close_input()
+    
+    if result_cache is not None:
+        logger.info(f"本地缓存命中 {result_cache.hits} 篇，共 {pending_count} 篇需要检索")
+    await write_queue.put(None)
+
+# 阶段4：取页面工作者，每个使用自己的会话，从调度器领取任务直到没有剩余工作
+async def fetch_worker(session, scheduler, parse_queue, executor):
+    loop = asyncio.get_running_loop()
+    started = False
+    while True:
+        task = await scheduler.get()
+        if task is None:
+            break
+        try:
+            # 领到第一个任务时才启动浏览器，待检索文章少时不会启动多余的浏览器
+            if not started:
+                await loop.run_in_executor(executor, session.start)
+                started = True
+                logger.info(f"{session.name}已就绪")
+            if asyncio.iscoroutinefunction(session.fetch):
+                results = await session.fetch(task)
+            else:
+                results = await loop.run_in_executor(executor, session.fetch, task)
+        except Exception as e:
+            # 任务取出后必须给出结果，否则调度器会一直等待这些文章
+            logger.error(f"{session.name}处理任务出错: {e}")
+            results = [(idx, None, 'timeout' if isinstance(e, TimeoutException) else 'error') for idx in task]
+        for result in results:
+            await parse_queue.put(result)
+        if not started:
+            logger.error(f"{session.name}启动失败，该工作者退出")
+            return
+
+# 阶段5：解析取回的页面
+async def parse_pages(parse_queue, write_queue, parse_executor):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await parse_queue.get()
+        if item is None:
+            break
+        result = await loop.run_in_executor(parse_executor, parse_fetched, *item)
+        await write_queue.put(('fetched',) + result)
+    await write_queue.put(None)
+
+# 阶段6：唯一的写入方，只有它修改df、写进度日志和缓存，并把结果交给重试调度器
+async def write_results(write_queue, scheduler, duplicates, producers, io_executor):
+    loop = asyncio.get_running_loop()
+    while producers:
+        item = await write_queue.get()
+        if item is None:
+            producers -= 1
+            continue
+        if item[0] == 'status':
+            await loop.run_in_executor(io_executor, record_status, *item[1:])
+            continue
+        source, idx, success, corr_authors, failure = item
+        if source == 'fanout':
+            await loop.run_in_executor(io_executor, fan_out_result, idx, success, corr_authors, failure)
+            continue
+        if source == 'cache':
+            await loop.run_in_executor(io_executor, record_result, idx, True, corr_authors, 'failed', True)
+        else:
+            retry = source == 'fetched' and scheduler.resolve(idx, success, failure)
+            attempts = dict(scheduler.attempts.get(idx, {}))
+            await loop.run_in_executor(io_executor, record_result, idx, success, corr_authors,
+                                       'retrying' if retry else 'failed', False, failure, attempts)
+            if retry:
+                continue
         
-        # 定期保存进度
-        if processed_count % update_interval == 0 or idx == failed_indices[-1]:
-            df.to_excel(output_file, index=False)
+        # 代表行有了最终结果，分发给同一篇文章的其他行
+        duplicates.finished[idx] = (success, corr_authors, failure)
+        for follower in duplicates.followers.pop(idx, []):
+            await loop.run_in_executor(io_executor, fan_out_result, follower, success, corr_authors, failure)
+
+# 等待流水线的所有阶段结束；任一阶段出错时取消其余阶段并抛出该错误，
+# 否则上下游会一直等待出错阶段的队列而卡住
+async def run_stages(tasks):
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_pipeline(scheduler, duplicates, mode, workers, batch_size, restored, retry_failed, queue_size=100):
+    """运行整个处理流水线，所有文章都有了最终结果后返回"""
+    row_queue = asyncio.Queue(queue_size)
+    lookup_queue = asyncio.Queue(queue_size)
+    parse_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    
+    # 缓存查询和结果写入共用一个线程：SQLite连接和进度日志只在这个线程中使用
+    io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='io')
+    parse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='parse')
+    fetch_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+    sessions, close_backend = new_sessions(workers)
+    
+    async def fetch_stage(input_stages):
+        await asyncio.gather(*(fetch_worker(session, scheduler, parse_queue, fetch_executor)
+                               for session in sessions))
         
-        # 返回主页准备下一个搜索
-        driver.get(base_url)
-        random_delay(2, 5)
+        # 所有工作者都已退出但仍有未处理的文章（例如浏览器都启动失败）
+        dropped = scheduler.abandon()
+        await asyncio.gather(*input_stages)
+        dropped += scheduler.abandon()
+        for idx in dropped:
+            logger.warning(f"第 {idx+1} 篇文章未被任何工作者处理")
+            await write_queue.put(('dropped', idx, False, "", 'error'))
+        await parse_queue.put(None)
+    
+    try:
+        input_stages = [
+            asyncio.create_task(read_rows(row_queue)),
+            asyncio.create_task(filter_rows(row_queue, lookup_queue, write_queue, scheduler, duplicates,
+                                            mode, restored, retry_failed)),
+            asyncio.create_task(lookup_cache(lookup_queue, write_queue, scheduler, batch_size, io_executor)),
+        ]
+        await run_stages(input_stages + [
+            asyncio.create_task(fetch_stage(input_stages)),
+            asyncio.create_task(parse_pages(parse_queue, write_queue, parse_executor)),
+            # 写入方等待两个上游（缓存查询和解析）都结束
+            asyncio.create_task(write_results(write_queue, scheduler, duplicates, 2, io_executor)),
+        ])
+    finally:
+        # 关闭浏览器或API连接
+        for session in sessions:
+            session.close()
+        close_backend()
+        for executor in (fetch_executor, parse_executor, io_executor):
+            executor.shutdown(wait=True)
+
+# 主处理函数，用异步流水线处理所有文章，失败的文章由重试调度器按类别穿插重试
+def main_scraping_process(mode='skip_marked', workers=1, batch_size=1, resume=False, retry_failed=False,
+                          retry_budgets=None, retry_delay=30, dedup=True):
+    """
+    爬取数据的主函数
+    
+    参数:
+    mode: 可选值 'complete' 或 'skip_marked'
+          'complete' - 重新检索并标记所有文章
+          'skip_marked' - 跳过已有通讯作者的文章
+    workers: 同时取页面的工作者（浏览器或API连接）数量
+    batch_size: 每次高级检索覆盖的文章数，大于1时使用 OR 组合的批量检索，未匹配的文章逐篇重试
+    resume: 为True时从进度文件和进度日志恢复上次运行的状态，只继续未完成的文章，否则清空进度日志
+    retry_failed: 断点续爬时，是否再重试一次上次重试次数已用完的失败文章
+    retry_budgets: {失败类别: 每篇文章最多重试次数}，默认见 retry_scheduler.default_retry_budgets
+    retry_delay: 第一次重试前等待的秒数，之后每次翻倍
+    dedup: 为True时按标题键和DOI/UT找出重复的文章，每篇只检索一次，结果分发给所有重复行
+    """
+    global success_count, fail_count, journal
+    
+    # 记录开始时间，用于计算总用时
+    start_time = datetime.now()
+    
+    # 没有用 load_input() 指定输入数据时，从当前目录的输入文件读取
+    if df is None:
+        load_input()
+    
+    logger.info(f"开始爬取数据... 模式: {mode}, 后端: {backend_settings['backend']}, 并行数量: {workers}, 批量大小: {batch_size}")
+    total_count = sum(shard_rows) if shard_rows is not None else len(titles)
+    logger.info(f"共有{total_count}篇文章需要处理" + (f"（分片 {shard_label(*shard)}）" if shard else ""))
+    
+    # 断点续爬：恢复上次运行的状态，已有结论的文章不再从头处理
+    restored = {}
+    if resume:
+        restored = apply_resume_state(load_resume_state())
+        restored_statuses = [record['status'] for record in restored.values()]
+        retrying_count = restored_statuses.count('retrying') + restored_statuses.count('failed_round1')
+        logger.info(f"已恢复 {len(restored)} 篇文章的状态: 成功 {restored_statuses.count('success')} 篇, "
+                    f"等待重试 {retrying_count} 篇, "
+                    f"最终失败 {restored_statuses.count('failed')} 篇")
+    
+    # 每篇文章的结果处理完立即追加到进度日志，不再定期重写整个Excel文件
+    journal = ProgressJournal(journal_file, reset=not resume) if journal_file else None
+    
+    # 失败的文章按类别插回同一个任务队列重试
+    scheduler = RetryScheduler(retry_budgets, base_delay=retry_delay, max_pending=max(2 * workers, 4))
     
-    # 关闭浏览器
-    driver.quit()
+    # 去重预处理：同一篇文章（相同标题键，或相同DOI/UT）的行分为一组
+    if dedup:
+        groups = group_duplicates(title_keys, df[doi_column] if doi_column else None,
+                                  df['UT'] if 'UT' in df.columns else None)
+    else:
+        groups = list(range(len(titles)))
+    duplicates = DuplicateGroups(groups)
+    
+    # 进度日志的预计剩余时间按本次实际要检索的行数计算：分片内的行，去掉已恢复结果、已标记和标题为空的行
+    if metrics is not None:
+        metrics.queue_rows(sum(1 for idx in range(len(titles))
+                               if (shard_rows is None or shard_rows[idx])
+                               and row_action(idx, mode, restored, retry_failed) in ('retry', 'search')))
+    asyncio.run(run_pipeline(scheduler, duplicates, mode, workers, batch_size, restored, retry_failed))
+    
+    if journal is not None:
+        journal.close()
+        journal = None
+    
+    # 记录最终失败的文章序号（+1 转换为从1开始的序号）
+    failed_article_indexes = [idx + 1 for idx in df[df['处理状态'] == 'failed'].index]
     
     # 计算总用时
     end_time = datetime.now()
@@ -466,38 +1175,214 @@ def main_scraping_process(mode='skip_marked'):
     
     # 只记录简要统计信息
     logger.info("\n========== 爬取结果摘要 ==========")
-    logger.info(f"总篇数: {len(titles)}")
+    logger.info(f"总篇数: {total_count}")
     logger.info(f"成功处理: {success_count} 篇")
     logger.info(f"处理失败: {fail_count} 篇")
     logger.info(f"已标记跳过: {marked_count} 篇")
+    if duplicates.saved:
+        logger.info(f"重复文章: {duplicates.saved} 篇，节省 {duplicates.saved} 次检索")
+    failure_summary = scheduler.failure_summary()
+    if failure_summary:
+        logger.info("失败原因: " + ', '.join(f"{name} {count} 篇" for name, count in failure_summary.most_common()))
     if failed_article_indexes:
         logger.info(f"失败文章序号: {', '.join(map(str, failed_article_indexes))}")
     logger.info(f"总用时: {int(hours)}小时{int(minutes)}分{int(seconds)}秒")
     
     return df, failed_article_indexes, total_time
 
+# 运行结束时输出各阶段耗时的百分位数，并把汇总写入JSON文件
+def report_metrics():
+    logger.info("\n========== 各阶段耗时 ==========")
+    for line in metrics.summary_lines():
+        logger.info(line)
+    summary_file = metrics.write_summary()
+    if summary_file:
+        logger.info(f"运行指标已写入 {metrics.path}，汇总写入 {summary_file}")
+
 # 主程序入口
 if __name__ == "__main__":
     import argparse
     
     # 创建参数解析器
     parser = argparse.ArgumentParser(description='Web of Science论文通讯作者爬虫')
+    parser.add_argument('--input', type=str, default=None,
+                      help='输入文件 (默认: 当前目录中的 ' + ' / '.join(input_candidates) + ')')
     parser.add_argument('--mode', type=str, choices=['complete', 'skip_marked'], default='skip_marked',
                       help='爬取模式: complete-重新处理所有文章, skip_marked-跳过已有通讯作者的文章 (默认: skip_marked)')
+    parser.add_argument('--workers', type=int, default=1,
+                      help='并行浏览器（或API连接）数量，大于1时启用多线程工作池 (默认: 1)')
+    parser.add_argument('--backend', type=str, choices=['selenium', 'api'], default='selenium',
+                      help='抓取后端: selenium-用浏览器打开详情页, api-使用机构的WOS API Key直接检索 (默认: selenium)')
+    parser.add_argument('--api-key', type=str, default=os.environ.get('WOS_API_KEY'),
+                      help='WOS API Key，默认读取环境变量 WOS_API_KEY')
+    parser.add_argument('--api-url', type=str, default=api_url,
+                      help=f'WOS API检索接口地址，离线测试时指向 mock_wos_api.py (默认: {api_url})')
+    parser.add_argument('--base-url', type=str, default=base_url,
+                      help=f'高级检索页面地址，离线测试时指向 mock_wos_site.py (默认: {base_url})')
+    parser.add_argument('--headless', action='store_true',
+                      help='浏览器使用无头模式，不显示窗口')
+    parser.add_argument('--recycle-pages', type=int, default=300,
+                      help='每个浏览器处理多少个页面后回收并换用新浏览器，0表示不按页数回收 (默认: 300)')
+    parser.add_argument('--recycle-rss-mb', type=float, default=None,
+                      help='浏览器进程树内存超过该值(MB)时回收，需要安装psutil (默认: 不检查)')
+    parser.add_argument('--no-warm-spare', action='store_true',
+                      help='回收浏览器时不提前在后台启动备用浏览器')
+    parser.add_argument('--batch-size', type=int, default=1,
+                      help='每次高级检索组合的文章数 (TI=(...) OR TI=(...))，1表示逐篇检索 (默认: 1)')
+    parser.add_argument('--no-dedup', action='store_true',
+                      help='不合并重复的文章（相同标题或DOI/UT），每一行都单独检索')
+    parser.add_argument('--retry-budgets', type=str, default='',
+                      help='按失败类别设置每篇文章最多重试次数，例如 timeout=5,no_hit=1；类别: no_hit, batch_miss, '
+                           'timeout, parse_error, error (默认: no_hit=0,batch_miss=1,timeout=3,parse_error=1,error=2)')
+    parser.add_argument('--retry-delay', type=float, default=30,
+                      help='第一次重试前等待的秒数，之后每次翻倍，最长10分钟 (默认: 30)')
+    parser.add_argument('--output', type=str, default=None,
+                      help='爬取结果文件，交给mark.py继续处理；安装了pyarrow时默认写列式中间文件 '
+                           'paper_with_authors_final.parquet，否则为 paper_with_authors_final.xlsx')
+    parser.add_argument('--resume', action='store_true',
+                      help='断点续爬：从 paper_with_authors_progress.xlsx 和进度日志恢复状态，只继续未完成和等待重试的文章'
+                           '（分片运行时为带分片后缀的文件）')
+    parser.add_argument('--retry-failed', action='store_true',
+                      help='与 --resume 一起使用，再重试一次上次重试次数已用完的失败文章')
+    parser.add_argument('--export-progress', action='store_true',
+                      help='不进行爬取，只根据进度日志生成 paper_with_authors_progress.xlsx')
+    parser.add_argument('--archive-pages', action='store_true',
+                      help='把每篇文章的详情页压缩保存到存档目录，清洗规则变化后可用 --reextract 离线重新提取')
+    parser.add_argument('--archive-dir', type=str, default='page_store',
+                      help='详情页存档目录 (默认: page_store)')
+    parser.add_argument('--reextract', action='store_true',
+                      help='不打开浏览器，用进程池重新解析存档目录中的全部页面并重建通讯作者列')
+    parser.add_argument('--processes', type=int, default=None,
+                      help='--reextract 使用的进程数 (默认: CPU核数)')
+    parser.add_argument('--cache-file', type=str, default='author_cache.sqlite',
+                      help='本地结果缓存文件 (默认: author_cache.sqlite)')
+    parser.add_argument('--cache-ttl-days', type=float, default=180,
+                      help='缓存有效天数，过期条目会被清除并重新检索 (默认: 180)')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='不使用本地结果缓存')
+    parser.add_argument('--refresh-cache', action='store_true',
+                      help='忽略已有缓存重新检索所有文章，并用新结果更新缓存')
+    parser.add_argument('--rate-limit', type=float, default=10,
+                      help='所有浏览器合计每分钟最多发起的页面请求次数，用于遵守机构的WOS访问配额，0表示不限制 (默认: 10)')
+    parser.add_argument('--shard', type=str, default=None,
+                      help='多台机器分片运行：只处理按标题哈希分到第i片（共N片）的文章，格式 i/N，例如 2/4；'
+                           '结果文件和进度日志名加上 _shard{i}of{N} 后缀')
+    parser.add_argument('--merge', type=str, nargs='+', default=None, metavar='SHARD_FILE',
+                      help='不进行爬取，把各分片的结果文件按原始行顺序合并写入 --output，并检查重复处理的行')
+    parser.add_argument('--metrics-file', type=str, default='scraper_metrics.jsonl',
+                      help='逐行记录每一步耗时的运行指标文件 (JSON Lines)，结束时另写 *_summary.json 汇总 '
+                           '(默认: scraper_metrics.jsonl)')
+    parser.add_argument('--no-metrics', action='store_true',
+                      help='不记录各阶段耗时')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                      help='在该端口提供Prometheus文本格式的 /metrics 接口，便于监控长时间运行 (默认: 不启用)')
+    parser.add_argument('--log-level', type=str, default='normal', choices=list(verbosity_levels),
+                      help='日志详细程度: quiet 只记录警告和错误，normal 记录每篇文章的处理过程和结果，'
+                           'verbose 另外记录每一步操作和原始作者信息 (默认: normal)')
+    parser.add_argument('--log-file', type=str, default='scraper_log.txt',
+                      help='文本日志文件 (默认: scraper_log.txt)')
+    parser.add_argument('--log-max-mb', type=float, default=50,
+                      help='日志文件超过该大小(MB)后滚动，0表示不滚动 (默认: 50)')
+    parser.add_argument('--log-backups', type=int, default=5,
+                      help='滚动后保留的旧日志文件个数 (默认: 5)')
+    parser.add_argument('--log-json', type=str, default='scraper_log.jsonl',
+                      help='JSON Lines 日志文件，每篇文章的处理结果另有一条结构化记录 (默认: scraper_log.jsonl)')
+    parser.add_argument('--no-log-json', action='store_true',
+                      help='不写JSON Lines日志')
     
     # 解析命令行参数
     args = parser.parse_args()
+    setup_logging(args.log_file, args.log_level, int(args.log_max_mb * 1024 * 1024), args.log_backups,
+                  None if args.no_log_json else args.log_json)
     logger.info(f"选择的爬取模式: {args.mode}")
     
+    # 6. 结果文件，默认优先使用列式中间文件，Excel只作为mark.py最终输出的格式
+    output_file = args.output
+    if output_file is None:
+        output_file = 'paper_with_authors_final.parquet' if pyarrow_available() else 'paper_with_authors_final.xlsx'
+    
+    if args.merge:
+        try:
+            merge_shard_files(args.merge, output_file)
+        except ValueError as e:
+            logger.error(f"合并分片失败: {e}")
+            raise SystemExit(1)
+        raise SystemExit(0)
+    
+    if args.workers < 1:
+        parser.error('--workers 必须大于等于1')
+    if args.batch_size < 1:
+        parser.error('--batch-size 必须大于等于1')
+    try:
+        retry_budgets = parse_retry_budgets(args.retry_budgets)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.retry_delay < 0:
+        parser.error('--retry-delay 不能为负数')
+    if args.backend == 'api' and not args.api_key:
+        parser.error('--backend api 需要 --api-key 或环境变量 WOS_API_KEY')
+    backend_settings.update(backend=args.backend, api_key=args.api_key, api_url=args.api_url)
+    base_url = args.base_url
+    headless = args.headless
+    if args.recycle_pages < 0:
+        parser.error('--recycle-pages 不能为负数')
+    driver_settings.update(max_pages=args.recycle_pages, max_rss_mb=args.recycle_rss_mb,
+                           warm_spare=not args.no_warm_spare)
+    if args.rate_limit < 0:
+        parser.error('--rate-limit 不能为负数')
+    if args.rate_limit > 0:
+        rate_limiter = TokenBucket(args.rate_limit)
+        logger.info(f"全局请求速率上限: 每分钟{args.rate_limit}次")
+    if not args.no_cache:
+        result_cache = ResultCache(args.cache_file, args.cache_ttl_days, args.refresh_cache)
+        logger.info(f"使用本地结果缓存: {args.cache_file}" + (" (刷新模式)" if args.refresh_cache else ""))
+    
+    load_input(args.input)
+    
+    if args.shard:
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        select_shard(shard_index, shard_count)
+        if args.output is None:
+            output_file = shard_path(output_file, shard_index, shard_count)
+        journal_file = shard_path(journal_file, shard_index, shard_count)
+        progress_file = shard_path(progress_file, shard_index, shard_count)
+    
+    if args.export_progress:
+        export_progress()
+        raise SystemExit(0)
+    
+    if not args.no_metrics:
+        metrics = RunMetrics(args.metrics_file)
+        if args.metrics_port is not None:
+            serve_prometheus(metrics, args.metrics_port)
+    
+    if args.reextract:
+        reextract_from_store(PageStore(args.archive_dir), args.processes)
+        write_output(output_file)
+        logger.info(f"重新提取的结果已写入 {output_file}")
+        raise SystemExit(0)
+    if args.archive_pages:
+        page_store = PageStore(args.archive_dir)
+        logger.info(f"详情页将存档到: {args.archive_dir}")
+    
     try:
         # 执行主要爬取过程，传入模式参数
-        df, failed_article_indexes, total_time = main_scraping_process(args.mode)
+        df, failed_article_indexes, total_time = main_scraping_process(args.mode, args.workers, args.batch_size,
+                                                                       args.resume, args.retry_failed,
+                                                                       retry_budgets, args.retry_delay,
+                                                                       not args.no_dedup)
         
-        # 6. 保存结果到Excel文件
-        output_file = 'paper_with_authors_final.xlsx'
-        df.to_excel(output_file, index=False)
+        # 保存结果
+        write_output(output_file)
+        logger.info(f"爬取结果已写入 {output_file}")
+        if metrics is not None:
+            report_metrics()
         
         # 打印最终统计
+        flush_logging()
         print("\n========== 爬取任务完成 ==========")
         print(f"总文章数: {len(df)}")
         print(f"成功处理: {success_count} 篇")
@@ -509,3 +1394,6 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"程序执行过程中发生错误: {e}")
         print(f"程序执行过程中发生错误: {e}")
+    finally:
+        if metrics is not None:
+            metrics.close()
@@ -0,0 +1,331 @@
+import os
+import csv
+import logging
+from title_normalizer import is_missing
+
+logger = logging.getLogger(__name__)
+
+# WOS导出的单元格可能很长（摘要、参考文献），放宽csv模块的字段长度限制
+csv.field_size_limit(2 ** 31 - 1)
+
+# WOS制表符导出字段到本工具列名的映射，AF(作者全名)优先于AU(作者缩写)
+wos_columns = {
+    '全部论文作者': ['AF', 'AU'],
+    '论文题目': ['TI'],
+}
+
+# 列式中间文件（Parquet / Arrow IPC）需要可选依赖pyarrow
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("读写 .parquet / .arrow 文件需要安装 pyarrow: pip install pyarrow")
+    return pyarrow
+
+def pyarrow_available():
+    try:
+        _import_pyarrow()
+        return True
+    except ImportError:
+        return False
+
+# 根据扩展名判断文件格式
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        return 'xlsx'
+    if ext == '.parquet':
+        return 'parquet'
+    if ext in ('.arrow', '.feather'):
+        return 'arrow'
+    if ext == '.csv':
+        return 'csv'
+    if ext == '.tsv':
+        return 'tsv'
+    if ext == '.txt':
+        return 'wos'  # WOS "Tab-delimited file" 导出
+    raise ValueError(f"不支持的文件格式: {path}")
+
+def _clean_value(value):
+    """空字符串统一视为空值，与pandas读取Excel时的行为一致"""
+    if value == '':
+        return None
+    return value
+
+def _iter_columnar_batches(path, batch_size=10000):
+    """按记录批次读取Parquet或Arrow IPC文件，返回 (表头, RecordBatch迭代器)"""
+    pa = _import_pyarrow()
+    if detect_format(path) == 'parquet':
+        parquet_file = pa.parquet.ParquetFile(path)
+        return parquet_file.schema_arrow.names, parquet_file.iter_batches(batch_size=batch_size)
+    # Arrow IPC文件通过内存映射读取，不需要先把整个文件读进内存
+    reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+    return reader.schema.names, (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+def _iter_raw(path):
+    """逐行读取原始表格，第一项为表头，之后每项为一行的值列表"""
+    fmt = detect_format(path)
+    if fmt in ('parquet', 'arrow'):
+        header, batches = _iter_columnar_batches(path)
+        yield list(header)
+        for batch in batches:
+            columns = [column.to_pylist() for column in batch.columns]
+            for values in zip(*columns):
+                yield list(values)
+        return
+    if fmt == 'xlsx':
+        # 只读模式按需解析，不把整个工作簿载入内存
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for values in workbook.active.iter_rows(values_only=True):
+                yield list(values)
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            reader = csv.reader(f)
+        elif fmt == 'tsv':
+            reader = csv.reader(f, dialect='excel-tab')
+        else:
+            # WOS导出不使用引号，标题中的引号是内容的一部分
+            reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+        for values in reader:
+            yield values
+
+def _wos_mapping(header):
+    """表头是WOS字段时，返回 [(本工具列名, WOS字段位置)]，否则返回空列表"""
+    if '论文题目' in header or 'TI' not in header:
+        return []
+    mapping = []
+    for column, fields in wos_columns.items():
+        for field in fields:
+            if field in header:
+                mapping.append((column, header.index(field)))
+                break
+    return mapping
+
+def iter_table(path):
+    """流式读取表格，返回 (表头, 行迭代器)，每行是按表头顺序排列的值列表
+
+    支持 xlsx（openpyxl只读模式）、csv、tsv 以及WOS制表符导出(.txt)。
+    WOS导出会在最前面补上 全部论文作者 和 论文题目 两列。
+    """
+    raw = _iter_raw(path)
+    try:
+        header = [str(name).strip() if name is not None else '' for name in next(raw)]
+    except StopIteration:
+        return [], iter(())
+    # 去掉表头末尾的空列（WOS导出每行以制表符结尾）
+    while header and header[-1] == '':
+        header.pop()
+    mapping = _wos_mapping(header)
+    width = len(header)
+
+    def rows():
+        for values in raw:
+            values = [_clean_value(value) for value in values[:width]]
+            values += [None] * (width - len(values))
+            if not any(value is not None for value in values):
+                continue  # 跳过空行
+            yield [values[pos] for _, pos in mapping] + values
+
+    return [column for column, _ in mapping] + header, rows()
+
+def read_header(path):
+    header, _ = iter_table(path)
+    return header
+
+def read_columns(path, columns):
+    """只读取需要的列，返回DataFrame，不存在的列会被忽略"""
+    import pandas as pd
+    header, rows = iter_table(path)
+    positions = [(column, header.index(column)) for column in columns if column in header]
+    data = {column: [] for column, _ in positions}
+    for values in rows:
+        for column, pos in positions:
+            data[column].append(values[pos])
+    return pd.DataFrame(data, dtype=object)
+
+def iter_chunks(path, chunk_size=10000):
+    """按块读取表格，每次返回最多chunk_size行的DataFrame，行索引在整个文件中连续"""
+    import pandas as pd
+    if detect_format(path) in ('parquet', 'arrow'):
+        # 列式文件直接按批次转换为DataFrame，不经过逐行解析
+        _, batches = _iter_columnar_batches(path, chunk_size)
+        offset = 0
+        for batch in batches:
+            # 含空值的整数列保持为整数，不转成小数
+            chunk = batch.to_pandas(integer_object_nulls=True).astype(object)
+            chunk.index = range(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+        return
+    
+    header, rows = iter_table(path)
+    chunk = []
+    offset = 0
+    for values in rows:
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk, columns=header, index=range(offset, offset + len(chunk)), dtype=object)
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=header, index=range(offset, offset + len(chunk)), dtype=object)
+
+# 流式写出表格，写入的行不在内存中累积
+class TableWriter:
+    """按行写出 xlsx（openpyxl只写模式）、csv、tsv，或 Parquet / Arrow IPC 列式文件
+
+    列式文件每攒够batch_rows行写出一个记录批次。各列的类型由pyarrow根据第一个批次中的值推断，
+    整数、小数、日期等保持原来的类型；同一列中类型混杂或全部为空时以字符串存储。
+    之后的批次与已推断的类型不符时，整数列放宽为小数，其余放宽为字符串，并改写已写出的批次。
+    """
+
+    def __init__(self, path, header, batch_rows=10000):
+        self.path = path
+        self.format = detect_format(path)
+        if self.format in ('parquet', 'arrow'):
+            self.pa = _import_pyarrow()
+            self.header = list(header)
+            self.schema = None   # 第一个批次写出时推断
+            self.writer = None
+            self.batch_rows = batch_rows
+            self.buffer = []
+        elif self.format == 'xlsx':
+            from openpyxl import Workbook
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet()
+            self.sheet.append(list(header))
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+            self.writer = csv.writer(self.file, dialect='excel' if self.format == 'csv' else 'excel-tab')
+            self.writer.writerow(header)
+
+    def write_row(self, values):
+        # pandas的缺失值（NaN、NaT、pd.NA）写成空单元格
+        values = [None if is_missing(value) else value for value in values]
+        if self.format in ('parquet', 'arrow'):
+            self.buffer.append(values)
+            if len(self.buffer) >= self.batch_rows:
+                self._flush()
+        elif self.format == 'xlsx':
+            self.sheet.append(values)
+        else:
+            self.writer.writerow(['' if value is None else value for value in values])
+
+    def _open(self, schema):
+        self.schema = schema
+        if self.format == 'parquet':
+            self.writer = self.pa.parquet.ParquetWriter(self.path, schema)
+        else:
+            self.writer = self.pa.ipc.new_file(self.path, schema)
+
+    def _infer_array(self, values):
+        """由pyarrow推断一列的类型，类型混杂时返回None，全部为空时类型为null"""
+        pa = self.pa
+        try:
+            return pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            return None
+
+    def _convert(self, values, field_type):
+        """把新批次的一列转换为已写出的类型，转换不了（类型不同或会丢失精度）时返回None"""
+        pa = self.pa
+        if field_type == pa.string():
+            return pa.array(_as_strings(values), type=pa.string())
+        array = self._infer_array(values)
+        if array is None:
+            return None
+        if pa.types.is_null(array.type):
+            return pa.nulls(len(values), field_type)
+        if array.type == field_type:
+            return array
+        numeric = lambda t: pa.types.is_integer(t) or pa.types.is_floating(t)
+        if (numeric(array.type) and numeric(field_type)) or \
+                (pa.types.is_temporal(array.type) and pa.types.is_temporal(field_type)):
+            try:
+                return array.cast(field_type)   # 默认安全转换，会截断或溢出时报错
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                return None
+        return None
+
+    def _wider_type(self, current, values):
+        """已写出的类型容纳不了新批次的值时，放宽后的类型"""
+        pa = self.pa
+        array = self._infer_array(values)
+        if pa.types.is_integer(current) and array is not None and pa.types.is_floating(array.type):
+            return pa.float64()
+        return pa.string()
+
+    def _flush(self):
+        pa = self.pa
+        columns = [list(column) for column in zip(*self.buffer)] if self.buffer else [[] for _ in self.header]
+        self.buffer = []
+        if self.schema is None:
+            arrays = []
+            for values in columns:
+                array = self._infer_array(values)
+                if array is None or pa.types.is_null(array.type):
+                    array = pa.array(_as_strings(values), type=pa.string())
+                arrays.append(array)
+            self._open(pa.schema([(name, array.type) for name, array in zip(self.header, arrays)]))
+        else:
+            arrays = [self._convert(values, field.type) for field, values in zip(self.schema, columns)]
+            widened = {pos: self._wider_type(field.type, values)
+                       for pos, (field, values, array) in enumerate(zip(self.schema, columns, arrays))
+                       if array is None}
+            if widened:
+                self._widen(widened)
+                for pos in widened:
+                    arrays[pos] = self._convert(columns[pos], self.schema.field(pos).type)
+        self.writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+
+    def _widen(self, widened):
+        """放宽若干列的类型：把已写出的批次逐批转换后写入新文件，再替换原文件"""
+        pa = self.pa
+        self.writer.close()
+        stem, ext = os.path.splitext(self.path)
+        old_path = f'{stem}.widen{ext}'
+        os.replace(self.path, old_path)
+        logger.info(f"{self.path}: 列 {', '.join(self.header[pos] for pos in widened)} 的类型不一致，已放宽")
+        schema = self.schema
+        for pos, field_type in widened.items():
+            schema = schema.set(pos, pa.field(self.header[pos], field_type))
+        self._open(schema)
+        try:
+            _, batches = _iter_columnar_batches(old_path, self.batch_rows)
+            for batch in batches:
+                arrays = list(batch.columns)
+                for pos, field_type in widened.items():
+                    if field_type == pa.string():
+                        arrays[pos] = pa.array(_as_strings(arrays[pos].to_pylist()), type=pa.string())
+                    else:
+                        arrays[pos] = arrays[pos].cast(field_type)
+                self.writer.write_batch(pa.record_batch(arrays, schema=schema))
+        finally:
+            os.remove(old_path)
+
+    def close(self):
+        if self.format in ('parquet', 'arrow'):
+            if self.buffer or self.schema is None:
+                self._flush()
+            self.writer.close()
+        elif self.format == 'xlsx':
+            self.workbook.save(self.path)
+        else:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _as_strings(values):
+    return [None if value is None else str(value) for value in values]
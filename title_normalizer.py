@@ -0,0 +1,76 @@
+import re
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 检索标题的清理规则合并为一个预编译的正则，一次扫描完成：
+#   (...)                       不含嵌套括号的括号及括号内容
+#   空白 + and/or/not + 空白或句点   高级检索中的运算符，只去掉前面的空白和单词本身，
+#                               后面的空白或句点保留，连续的运算符也能在同一次扫描中去掉
+search_cleanup_pattern = re.compile(
+    r'\([^()]*\)'
+    r'|\s+(?:[Aa][Nn][Dd]|[Oo][Rr]|[Nn][Oo][Tt])(?=[\s.])'
+)
+
+# 标题键中去掉的字符：标点、空白、下划线，以及NFKD分解出的重音符号等组合字符
+key_strip_pattern = re.compile(r'[\W_]+')
+
+def is_missing(value):
+    """与 pd.isna 对单个值的判断相同（None、NaN、NaT、pd.NA），不需要导入pandas"""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        return True  # pd.NA 的比较结果仍是 pd.NA，不能转为布尔值
+
+def _clean(title):
+    # 一次正则替换，再用 split/join 合并多余空白并去掉首尾空白
+    return ' '.join(search_cleanup_pattern.sub('', title).split())
+
+def clean_title(title):
+    """从标题中移除 and, or, not 等关键词以及括号及括号内容，用于 TI=(...) 检索"""
+    if is_missing(title):
+        return title
+    return _clean(str(title))
+
+def normalize_titles(titles):
+    """对整列标题做与 clean_title 相同的清理，空值保持为空
+
+    清理规则合并在一个函数里对整列只扫描一次；pandas对object列的 .str 方法每个操作都要
+    逐行遍历一遍，串联多个 .str 操作反而更慢
+    """
+    import pandas as pd
+    titles = pd.Series(titles, dtype=object)
+    values = titles.to_numpy()
+    present = titles.notna().to_numpy()
+    cleaned = values.copy()
+    cleaned[present] = [_clean(value if type(value) is str else str(value)) for value in values[present]]
+    changed = int((cleaned[present] != values[present]).sum())
+    if changed:
+        logger.info(f"已清理 {changed} 个检索标题中的 and/or/not 和括号")
+    return pd.Series(cleaned, index=titles.index, dtype=object)
+
+def _key(title):
+    return key_strip_pattern.sub('', unicodedata.normalize('NFKD', title).casefold())
+
+def match_key(title):
+    """标题匹配键：Unicode兼容分解、忽略大小写（casefold），去掉标点、空白和重音符号
+
+    结果缓存、进度日志、详情页存档和检索结果匹配都使用同一个键
+    """
+    if is_missing(title):
+        return ''
+    return _key(str(title))
+
+def match_keys(titles):
+    """整列计算标题匹配键，空值的键为空字符串"""
+    import numpy as np
+    import pandas as pd
+    titles = pd.Series(titles, dtype=object)
+    values = titles.to_numpy()
+    present = titles.notna().to_numpy()
+    keys = np.full(len(values), '', dtype=object)
+    keys[present] = [_key(value if type(value) is str else str(value)) for value in values[present]]
+    return pd.Series(keys, index=titles.index, dtype=object)
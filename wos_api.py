@@ -0,0 +1,133 @@
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Web of Science Expanded API 检索接口
+api_url = 'https://wos-api.clarivate.com/api/wos'
+
+# 每次请求最多返回的记录数（接口上限为100）
+max_page_size = 100
+
+# 每个检索式最多获取的页数：按标题精确匹配只需要最前面的结果，
+# 很短的标题可能命中上千条记录，全部翻页会用掉大量请求配额
+default_max_pages = 2
+
+class WosApiError(Exception):
+    """API返回错误状态，status为HTTP状态码，429和5xx表示配额或服务端的临时问题"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+    @property
+    def transient(self):
+        return self.status == 429 or self.status >= 500
+
+# JSON由XML转换而来，只有一项时是对象而不是列表，空值可能是空字符串
+def as_list(value):
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+def record_title(record):
+    """记录的文章标题（type为item的标题）"""
+    titles = as_list(record.get('static_data', {}).get('summary', {}).get('titles', {}).get('title'))
+    for title in titles:
+        if title.get('type') == 'item':
+            return title.get('content') or ''
+    return ''
+
+def record_corresponding_authors(record):
+    """记录中通讯作者（reprint address）的姓名，格式为 "姓, 名"，顺序与记录一致，未清洗"""
+    metadata = record.get('static_data', {}).get('fullrecord_metadata', {})
+    names = []
+    for address in as_list(metadata.get('reprint_addresses', {}).get('address_name')):
+        for name in as_list(address.get('names', {}).get('name')):
+            # 优先使用全名，与详情页中显示的作者名一致
+            names.append(name.get('full_name') or name.get('display_name') or name.get('wos_standard') or '')
+    return [name for name in names if name]
+
+def is_transient(error):
+    """网络错误、超时和服务端临时错误，重试可能成功"""
+    import urllib3
+    return isinstance(error, (urllib3.exceptions.HTTPError, OSError)) or getattr(error, 'transient', False)
+
+# WOS API客户端：复用长连接，同一查询的后续几页并发获取
+class WosApiClient:
+    """通过机构的 Web of Science API Key 检索文章，不需要浏览器
+
+    参数:
+    api_key: API Key，放在 X-ApiKey 请求头中
+    base_url: 检索接口地址，离线测试时指向 mock_wos_api.py 启动的本地服务
+    database: 检索的数据库，默认 WOS 核心合集
+    max_connections: 连接池中保持的长连接数，一般与并发任务数相同
+    timeout: 单次请求的超时秒数
+    max_pages: 每个检索式最多获取的页数
+    page_concurrency: 同一检索式的后续页最多同时请求几页
+    before_request: 每次请求前在请求线程中调用的函数（例如全局限速器），每一页都计为一次请求
+    """
+
+    def __init__(self, api_key, base_url=api_url, database='WOS', max_connections=4, timeout=30,
+                 max_pages=default_max_pages, page_concurrency=2, before_request=None):
+        self.base_url = base_url
+        self.database = database
+        self.max_pages = max_pages
+        self.page_concurrency = page_concurrency
+        self.before_request = before_request
+        # urllib3随selenium一起安装，只在创建客户端时导入；PoolManager在多个线程间共享长连接
+        import urllib3
+        self.http = urllib3.PoolManager(
+            num_pools=1,
+            maxsize=max_connections,
+            block=True,
+            headers={'X-ApiKey': api_key, 'Accept': 'application/json'},
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False,  # 重试交给retry_scheduler按失败类别处理
+        )
+
+    def fetch_page(self, query, first_record=1, count=max_page_size):
+        """同步获取一页检索结果，返回 (命中总数, 记录列表)"""
+        if self.before_request is not None:
+            self.before_request()
+        response = self.http.request('GET', self.base_url, fields={
+            'databaseId': self.database,
+            'usrQuery': query,
+            'count': str(count),
+            'firstRecord': str(first_record),
+        })
+        if response.status != 200:
+            raise WosApiError(response.status, response.data[:200].decode('utf-8', 'replace'))
+        data = json.loads(response.data)
+        found = int(data.get('QueryResult', {}).get('RecordsFound', 0))
+        records = data.get('Data', {}).get('Records', {}).get('records') or {}
+        return found, as_list(records.get('REC') if isinstance(records, dict) else None)
+
+    async def search(self, query, page_size=max_page_size):
+        """检索并返回最前面 max_pages 页的记录，第一页之后的各页在线程中并发请求，同时最多 page_concurrency 页"""
+        loop = asyncio.get_running_loop()
+        found, records = await loop.run_in_executor(None, self.fetch_page, query, 1, page_size)
+        starts = range(1 + page_size, min(found, self.max_pages * page_size) + 1, page_size)
+        if found > self.max_pages * page_size:
+            logger.info(f"检索命中 {found} 条记录，只获取前 {self.max_pages} 页")
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def fetch(start):
+            async with semaphore:
+                return await loop.run_in_executor(None, self.fetch_page, query, start, page_size)
+
+        for _, page in await asyncio.gather(*(fetch(start) for start in starts)):
+            records.extend(page)
+        return records
+
+    async def search_titles(self, titles):
+        """用 TI=(...) OR TI=(...) 一次检索多篇文章，返回 [(文章标题, 通讯作者姓名列表)]"""
+        query = ' OR '.join(f'TI=({title})' for title in titles)
+        records = await self.search(query)
+        return [(record_title(record), record_corresponding_authors(record)) for record in records]
+
+    def close(self):
+        self.http.clear()